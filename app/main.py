@@ -11,6 +11,8 @@ from routes import users, restaurant_chains, restaurant_outlets, subscriptions,m
 
 # Import database and middleware
 from utils.database import engine, Base, get_db
+from utils.pdf_render_pool import render_pool
+from utils.event_backplane import backplane
 
 # Load environment variables
 load_dotenv()
@@ -57,6 +59,20 @@ app.include_router(billing.router)
 app.include_router(order_management.router) 
 app.include_router(notifications.router)
 
+# Relay WebSocket events between workers for the app's lifetime
+@app.on_event("startup")
+async def start_event_backplane():
+    await backplane.start()
+
+@app.on_event("shutdown")
+async def stop_event_backplane():
+    await backplane.stop()
+
+# Stop PDF render workers with the app
+@app.on_event("shutdown")
+def shutdown_render_pool():
+    render_pool.shutdown()
+
 # Root endpoint
 @app.get("/")
 async def root():
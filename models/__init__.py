@@ -3,8 +3,9 @@ from models.restaurant_chain import RestaurantChain
 from models.restaurant_outlet import RestaurantOutlet
 from models.subscription import Subscription
 from models.menu_management import MenuCategory   ,MenuItem
-from models.order_management import Order, OrderItem    
+from models.order_management import Order, OrderItem, OrderTokenCounter
 from models.table_management import Area,Table
+from models.event_log import OutletEventCounter, OutletEvent
 
 # Register all models
-__all__ = ['User', 'RestaurantChain', 'RestaurantOutlet','Subscription','MenuCategory','MenuItem','Order','OrderItem','Area','Table']
\ No newline at end of file
+__all__ = ['User', 'RestaurantChain', 'RestaurantOutlet','Subscription','MenuCategory','MenuItem','Order','OrderItem','OrderTokenCounter','Area','Table','OutletEventCounter','OutletEvent']
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, func
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Enum, func
 from sqlalchemy.orm import relationship
 from utils.database import Base
 from datetime import datetime
@@ -31,6 +31,7 @@ class Invoice(Base):
     total_amount = Column(Float, nullable=False)
     status = Column(Enum(InvoiceStatus), default=InvoiceStatus.PENDING, nullable=False)
     created_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    paid_at = Column(DateTime, nullable=True)  # When payment completed; drives the daily sales rollup
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -66,4 +67,28 @@ class SplitBill(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
-    invoice = relationship("Invoice", backref="split_bills")
\ No newline at end of file
+    invoice = relationship("Invoice", backref="split_bills")
+
+class InvoiceNumberCounter(Base):
+    __tablename__ = "invoice_number_counters"
+
+    outlet_id = Column(Integer, ForeignKey("restaurant_outlets.id", ondelete="CASCADE"), primary_key=True)
+    fiscal_year = Column(Integer, primary_key=True)  # Calendar year the fiscal year starts in
+    last_value = Column(Integer, nullable=False, default=0)
+
+
+class DailyOutletSales(Base):
+    __tablename__ = "daily_outlet_sales"
+
+    outlet_id = Column(Integer, ForeignKey("restaurant_outlets.id", ondelete="CASCADE"), primary_key=True)
+    business_date = Column(Date, primary_key=True)  # IST date the invoices were paid on
+    gross_amount = Column(Float, nullable=False, default=0.0)
+    discount_amount = Column(Float, nullable=False, default=0.0)
+    tax_amount = Column(Float, nullable=False, default=0.0)
+    net_amount = Column(Float, nullable=False, default=0.0)
+    invoice_count = Column(Integer, nullable=False, default=0)
+    payment_count = Column(Integer, nullable=False, default=0)
+    cash_amount = Column(Float, nullable=False, default=0.0)
+    card_amount = Column(Float, nullable=False, default=0.0)
+    upi_amount = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey
+from utils.database import Base
+from datetime import datetime
+
+class OutletEventCounter(Base):
+    __tablename__ = "outlet_event_counters"
+
+    outlet_id = Column(Integer, ForeignKey("restaurant_outlets.id", ondelete="CASCADE"), primary_key=True)
+    last_seq = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class OutletEvent(Base):
+    __tablename__ = "outlet_events"
+
+    outlet_id = Column(Integer, ForeignKey("restaurant_outlets.id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(BigInteger, primary_key=True)
+    topic = Column(String, nullable=False)
+    payload = Column(String, nullable=False)  # JSON-encoded event as sent to clients
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
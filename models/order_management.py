@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, func
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Enum, Index, func
 from sqlalchemy.orm import relationship
 from utils.database import Base
 from datetime import datetime
@@ -37,6 +37,21 @@ class Order(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # KOT state counters, maintained as KOTs are created and transition
+    kots_total = Column(Integer, default=0, server_default="0", nullable=False)
+    kots_pending = Column(Integer, default=0, server_default="0", nullable=False)
+    kots_preparing = Column(Integer, default=0, server_default="0", nullable=False)
+    kots_ready = Column(Integer, default=0, server_default="0", nullable=False)
+    kots_completed = Column(Integer, default=0, server_default="0", nullable=False)
+    kots_cancelled = Column(Integer, default=0, server_default="0", nullable=False)
+
+    __table_args__ = (
+        Index("ix_orders_created_id", "created_at", "id"),
+        Index("ix_orders_outlet_created_id", "outlet_id", "created_at", "id"),
+        Index("ix_orders_outlet_status_created_id", "outlet_id", "status", "created_at", "id"),
+        Index("ix_orders_table_created_id", "table_id", "created_at", "id"),
+    )
+
     # Relationships
     outlet = relationship("RestaurantOutlet", back_populates="orders")
     invoices = relationship("Invoice", back_populates="order", cascade="all, delete-orphan")
@@ -66,6 +81,7 @@ class OrderItem(Base):
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)
     notes = Column(String, nullable=True)
+    seat_number = Column(Integer, nullable=True)  # Used for per-seat bill splits
 
 
     # Relationships
@@ -73,13 +89,36 @@ class OrderItem(Base):
     menu_item = relationship("MenuItem")
     kot = relationship("KOT", back_populates="order_item", uselist=False)
 
+    @property
+    def menu_item_name(self):
+        return self.menu_item.name if self.menu_item else None
+
+    @property
+    def kot_status(self):
+        return self.kot.status if self.kot else None
+
 class KOT(Base):
     __tablename__ = "kots"
 
     id = Column(Integer, primary_key=True, index=True)
     order_item_id = Column(Integer, ForeignKey("order_items.id"), nullable=False)
+    outlet_id = Column(Integer, ForeignKey("restaurant_outlets.id"), nullable=False)  # Denormalized from the order for the kitchen queue
     status = Column(Enum(KOTStatus), default=KOTStatus.PENDING, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Last status transition
+
+    __table_args__ = (
+        Index("ix_kots_outlet_status_created", "outlet_id", "status", "created_at"),
+    )
 
 
     # Relationships
-    order_item = relationship("OrderItem", back_populates="kot")
\ No newline at end of file
+    order_item = relationship("OrderItem", back_populates="kot")
+
+class OrderTokenCounter(Base):
+    __tablename__ = "order_token_counters"
+
+    outlet_id = Column(Integer, ForeignKey("restaurant_outlets.id", ondelete="CASCADE"), primary_key=True)
+    business_date = Column(Date, nullable=True)  # Set only when tokens reset daily
+    last_value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
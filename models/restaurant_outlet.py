@@ -16,6 +16,7 @@ class RestaurantOutlet(Base):
     country = Column(String, nullable=False)
     phone = Column(String, nullable=True)
     email = Column(String, nullable=True)
+    gst_number = Column(String, nullable=True)  # Printed on receipts
     is_active = Column(Boolean, default=True) 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
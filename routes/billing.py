@@ -1,89 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException,WebSocket, WebSocketDisconnect, status, Request
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException,WebSocket, status, Request, Query
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List,Dict,Optional
+from sqlalchemy import and_, insert
+from typing import List,Optional
 from utils.database import get_db
 
-from schemas.billing import InvoiceCreate, InvoiceResponse, SplitBillRequest
+from schemas.billing import DailySalesReport, InvoiceCreate, InvoiceResponse, ReceiptResponse, SplitBillRequest
 from models.user import User, UserRole
-from models.billing import Invoice, Payment, SplitBill, PaymentStatus,InvoiceStatus
-from models.order_management import Order, OrderStatus
+from models.billing import DailyOutletSales, Invoice, Payment, SplitBill, PaymentStatus,InvoiceStatus
+from models.order_management import Order, OrderItem, OrderStatus
 from models.table_management import TableStatus
 from utils.auth import get_current_active_user
-from models.restaurant_outlet import RestaurantOutlet
+from utils.outlet_scope import get_outlet_scope, outlet_index
 import json
-from datetime import datetime
-from utils.pdf_generator import generate_receipt_pdf
+from datetime import date, datetime
+from utils.pdf_generator import render_receipt_pdf, receipt_cache_key
+from utils.pdf_render_pool import render_pool
+from utils.invoice_snapshot import InvoiceSnapshot, load_invoice_snapshot
+from utils.pdf_cache import receipt_cache
+from utils.escpos import ESCPOS_MEDIA_TYPE, render_receipt_escpos
+from utils.invoice_export import guarded_stream, invoice_export_filter, iter_invoices, stream_receipts_pdf, stream_receipts_zip
+from utils.idempotency import IdempotentRoute
+from utils.event_outbox import get_outbox
+from utils.websocket_broker import ENCODING_JSON, TOPIC_BILLING, TOPIC_ORDER_STATUS, broker
+from routes.notifications import notify_billing_update, notify_order_status_update
+from utils.sales_rollup import AMOUNT_COLUMNS, record_invoice_sale
+from utils.invoice_numbering import generate_invoice_number, reserve_invoice_numbers
+from utils.loader_profiles import INVOICE_RESPONSE, load_invoices
+from utils.split_engine import (
+    OrderLine,
+    SplitError,
+    split_by_amount,
+    split_by_items,
+    split_by_seat,
+    split_equally,
+    to_major
+)
 import logging
 
 
 
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/api/v1/billing", tags=["billing"])
-
-# WebSocket Connection Manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[int, List[WebSocket]] = {}  # outlet_id -> List[WebSocket]
-
-    async def connect(self, websocket: WebSocket, outlet_id: int):
-        await websocket.accept()
-        if outlet_id not in self.active_connections:
-            self.active_connections[outlet_id] = []
-        self.active_connections[outlet_id].append(websocket)
-        logger.debug(f"WebSocket connected for outlet {outlet_id}. Total connections: {len(self.active_connections[outlet_id])}")
-
-    def disconnect(self, websocket: WebSocket, outlet_id: int):
-        if outlet_id in self.active_connections:
-            self.active_connections[outlet_id].remove(websocket)
-            if not self.active_connections[outlet_id]:
-                del self.active_connections[outlet_id]
-            logger.debug(f"WebSocket disconnected for outlet {outlet_id}. Total connections: {len(self.active_connections.get(outlet_id, []))}")
-
-    async def broadcast(self, message: dict, outlet_id: int):
-        if outlet_id in self.active_connections:
-            for connection in self.active_connections[outlet_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.warning(f"Failed to send WebSocket message to outlet {outlet_id}: {str(e)}")
-
-connection_manager = ConnectionManager()
-
-# Notify order status update
-async def notify_order_status_update(data: dict):
-    outlet_id = data.get("outlet_id")
-    if not outlet_id:
-        logger.warning("No outlet_id provided in notify_order_status_update")
-        return
+# POSTs accept an Idempotency-Key so tablets can safely retry invoice and payment calls
+router = APIRouter(prefix="/api/v1/billing", tags=["billing"], route_class=IdempotentRoute)
 
-    logger.debug(f"Sending order status update for outlet {outlet_id}: {data}")
-    try:
-        await connection_manager.broadcast(data, outlet_id)
-    except Exception as e:
-        logger.warning(f"Failed to broadcast order status update for outlet {outlet_id}: {str(e)}")
+# Longest range the daily sales report returns
+MAX_REPORT_DAYS = 366
 
 # WebSocket endpoint for order status updates
 @router.websocket("/ws/order-status/{outlet_id}")
-async def websocket_order_status(websocket: WebSocket, outlet_id: int, db: Session = Depends(get_db)):
-    # Validate outlet
-    outlet = db.query(RestaurantOutlet).filter(RestaurantOutlet.id == outlet_id).first()
-    if not outlet:
+async def websocket_order_status(
+    websocket: WebSocket,
+    outlet_id: int,
+    since: Optional[int] = None,
+    encoding: str = ENCODING_JSON,
+    heartbeat: bool = False
+):
+    # Validate against the cached outlet index, so no pooled connection is held while the socket is open
+    if not await outlet_index.contains(outlet_id):
         await websocket.close(code=4000, reason="Invalid outlet ID")
         return
 
-    try:
-        await connection_manager.connect(websocket, outlet_id)
-        while True:
-            await websocket.receive_text()  # Keep connection alive
-    except WebSocketDisconnect:
-        connection_manager.disconnect(websocket, outlet_id)
-    except Exception as e:
-        logger.error(f"WebSocket error for outlet {outlet_id}: {str(e)}")
-        connection_manager.disconnect(websocket, outlet_id)
-        await websocket.close(code=4000, reason=str(e))
+    await broker.serve(websocket, outlet_id, [TOPIC_ORDER_STATUS, TOPIC_BILLING], since, encoding, heartbeat)
 
 
 # Dependency for authorized users (superadmin, owner, manager)
@@ -92,40 +71,6 @@ def get_authorized_user(current_user: User = Depends(get_current_active_user)):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
     return current_user
 
-# Helper to get authorized outlet IDs
-def get_authorized_outlet_ids(current_user: User, db: Session) -> List[int]:
-    if current_user.role == UserRole.SUPERADMIN:
-        return [outlet.id for outlet in db.query(RestaurantOutlet).all()]
-    elif current_user.role == UserRole.OWNER:
-        chain_ids = [chain.id for chain in current_user.restaurant_chains]
-        return [outlet.id for outlet in db.query(RestaurantOutlet).filter(RestaurantOutlet.chain_id.in_(chain_ids)).all()]
-    elif current_user.role == UserRole.MANAGER:
-        if not current_user.outlet:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not assigned to any outlet")
-        return [current_user.outlet.id]
-    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid user role")
-
-# Generate outlet-specific invoice number
-def generate_invoice_number(db: Session, outlet_id: int) -> str:
-    outlet = db.query(RestaurantOutlet).filter(RestaurantOutlet.id == outlet_id).first()
-    if not outlet:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Outlet not found")
-    
-    latest_invoice = db.query(Invoice).filter(Invoice.order_id.in_(
-        db.query(Order.id).filter(Order.outlet_id == outlet_id)
-    )).order_by(Invoice.id.desc()).first()
-    
-    if not latest_invoice or not latest_invoice.invoice_number:
-        return f"O{outlet_id}-INV-001"
-    
-    
-    try:
-        latest_num = int(latest_invoice.invoice_number.split('-')[-1])
-        return f"{outlet.name[:3].upper()}-INV-{latest_num + 1:03d}"
-    except (IndexError, ValueError):
-        logger.error(f"Invalid invoice number format: {latest_invoice.invoice_number}")
-        return f"{outlet.name[:3].upper()}-INV-001"
-
 @router.post("/invoices", response_model=InvoiceResponse, status_code=status.HTTP_201_CREATED)
 async def create_invoice(
     request: Request,
@@ -143,8 +88,7 @@ async def create_invoice(
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
         
         # Check user permissions
-        authorized_outlet_ids = get_authorized_outlet_ids(current_user, db)
-        if order.outlet_id not in authorized_outlet_ids:
+        if not get_outlet_scope(current_user, db).allows(order.outlet_id):
             logger.warning(f"User {current_user.id} attempted to invoice order {order.id} for unauthorized outlet {order.outlet_id}")
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No permission for this outlet")
 
@@ -193,10 +137,18 @@ async def create_invoice(
             )
             db.add(payment)
 
+        # Tell the outlet's billing screens once committed
+        get_outbox(db).enqueue(notify_billing_update, {
+            "type": "invoice_created",
+            "id": invoice.id,
+            "order_id": order.id,
+            "outlet_id": order.outlet_id,
+            "invoice_number": invoice.invoice_number,
+            "total_amount": invoice.total_amount
+        })
         db.commit()
-        db.refresh(invoice)
         logger.info(f"Invoice {invoice.id} created by user {current_user.id} for order {order.id}")
-        return invoice
+        return load_invoices(db, [invoice.id])[0]
 
     except HTTPException as e:
         db.rollback()
@@ -208,28 +160,153 @@ async def create_invoice(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to create invoice: {str(e)}")
 
 
-@router.get("/invoices/{invoice_id}/pdf")
-def download_invoice_pdf(invoice_id: int, db: Session = Depends(get_db),   current_user: User = Depends(get_authorized_user)):
-    
-    # Get invoice and validate
-    invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
-    if not invoice:
+@router.get("/invoices/export")
+def export_invoices(
+    outlet_id: int,
+    start_date: date,
+    end_date: date,
+    export_format: str = Query("zip", alias="format", pattern="^(zip|pdf)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_authorized_user)
+):
+    if not get_outlet_scope(current_user, db).allows(outlet_id):
+        logger.warning(f"User {current_user.id} attempted to export invoices for unauthorized outlet {outlet_id}")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No permission for this outlet")
+    if end_date < start_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_date must not be before start_date")
+
+    has_invoices = db.query(
+        db.query(Invoice.id).join(Order).filter(*invoice_export_filter(outlet_id, start_date, end_date)).exists()
+    ).scalar()
+    if not has_invoices:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No invoices in this date range")
+
+    invoices = iter_invoices(outlet_id, start_date, end_date)
+    filename = f"invoices_O{outlet_id}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.{export_format}"
+    if export_format == "zip":
+        chunks, media_type = stream_receipts_zip(invoices), 'application/zip'
+    else:
+        chunks, media_type = stream_receipts_pdf(invoices), 'application/pdf'
+
+    logger.info(f"User {current_user.id} exporting invoices for outlet {outlet_id} from {start_date} to {end_date} as {export_format}")
+    return StreamingResponse(
+        guarded_stream(chunks, filename),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+RECEIPT_MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "escpos": ESCPOS_MEDIA_TYPE,
+    "json": "application/json"
+}
+
+# Pick the receipt format from the first Accept media type we can produce
+def negotiate_receipt_format(accept: Optional[str]) -> str:
+    formats_by_media_type = {media_type: name for name, media_type in RECEIPT_MEDIA_TYPES.items()}
+    for part in (accept or "").split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in formats_by_media_type:
+            return formats_by_media_type[media_type]
+    return "pdf"
+
+# Load the receipt snapshot the current user may see, then release the session
+def load_scoped_snapshot(db: Session, invoice_id: int, current_user: User) -> InvoiceSnapshot:
+    snapshot = load_invoice_snapshot(db, invoice_id, get_outlet_scope(current_user, db))
+    if snapshot is None:
         raise HTTPException(status_code=404, detail="Invoice not found")
-    
-    # Generate PDF
-    base_url = "http://localhost:8000/api/v1/billing"  # Update with actual base URL
-    pdf_buffer = generate_receipt_pdf(invoice, base_url)
-    
-    # Return PDF as downloadable file
+    # Rendering needs nothing more from the database, so free the connection now
+    db.close()
+    return snapshot
+
+# Serve the cached receipt PDF, rendering it in the pool on a miss
+async def receipt_pdf_response(snapshot: InvoiceSnapshot, request: Request) -> Response:
+    cache_key = receipt_cache_key(snapshot)
+    etag = f'"{cache_key}"'
     headers = {
-        'Content-Disposition': f'attachment; filename="invoice_{invoice.invoice_number}.pdf"'
+        'Content-Disposition': f'attachment; filename="invoice_{snapshot.invoice_number}.pdf"',
+        'ETag': etag,
+        'Cache-Control': 'private, no-cache'
     }
-    
-    return StreamingResponse(
-        pdf_buffer,
-        media_type='application/pdf',
-        headers=headers
-    )
+
+    # Reprints of an unchanged bill are answered without rendering or sending the body
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    cached = receipt_cache.get(cache_key)
+    if isinstance(cached, str):
+        return FileResponse(cached, media_type='application/pdf', headers=headers)
+    if cached is None:
+        cached = await render_pool.render(render_receipt_pdf, snapshot)
+        receipt_cache.put(cache_key, cached)
+
+    return Response(content=cached, media_type='application/pdf', headers=headers)
+
+@router.get("/invoices/{invoice_id}/pdf")
+async def download_invoice_pdf(
+    invoice_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_authorized_user)
+):
+    snapshot = load_scoped_snapshot(db, invoice_id, current_user)
+    return await receipt_pdf_response(snapshot, request)
+
+@router.get("/invoices/{invoice_id}/receipt", responses={200: {"model": ReceiptResponse}})
+async def print_invoice_receipt(
+    invoice_id: int,
+    request: Request,
+    receipt_format: Optional[str] = Query(None, alias="format", pattern="^(pdf|escpos|json)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_authorized_user)
+):
+    """PDF by default; ESC/POS or JSON via ?format= or the Accept header."""
+    receipt_format = receipt_format or negotiate_receipt_format(request.headers.get("accept"))
+    snapshot = load_scoped_snapshot(db, invoice_id, current_user)
+
+    if receipt_format == "json":
+        return ReceiptResponse.from_snapshot(snapshot)
+    if receipt_format == "escpos":
+        # Building ESC/POS bytes takes well under a millisecond, so it runs inline
+        return Response(
+            content=render_receipt_escpos(snapshot),
+            media_type=ESCPOS_MEDIA_TYPE,
+            headers={'Content-Disposition': f'attachment; filename="invoice_{snapshot.invoice_number}.bin"'}
+        )
+    return await receipt_pdf_response(snapshot, request)
+
+@router.get("/reports/daily", response_model=DailySalesReport)
+async def get_daily_sales_report(
+    outlet_id: int,
+    start_date: date,
+    end_date: date,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_authorized_user)
+):
+    if not get_outlet_scope(current_user, db).allows(outlet_id):
+        logger.warning(f"User {current_user.id} attempted to read sales for unauthorized outlet {outlet_id}")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No permission for this outlet")
+    if end_date < start_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_date must not be before start_date")
+    if (end_date - start_date).days > MAX_REPORT_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Date range cannot exceed {MAX_REPORT_DAYS} days")
+
+    # One rollup row per trading day, read from the primary key
+    days = db.query(DailyOutletSales).filter(
+        DailyOutletSales.outlet_id == outlet_id,
+        DailyOutletSales.business_date >= start_date,
+        DailyOutletSales.business_date <= end_date
+    ).order_by(DailyOutletSales.business_date).all()
+
+    totals = {column: sum(getattr(day, column) for day in days) for column in AMOUNT_COLUMNS}
+    return DailySalesReport(outlet_id=outlet_id, start_date=start_date, end_date=end_date, days=days, totals=totals)
+
+@router.get("/render-pool/metrics")
+async def get_render_pool_metrics(current_user: User = Depends(get_current_active_user)):
+    if current_user.role != UserRole.SUPERADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only superadmins can view render metrics")
+    return render_pool.metrics()
 
 @router.get("/invoices/{invoice_id}", response_model=InvoiceResponse)
 async def get_invoice(
@@ -237,10 +314,10 @@ async def get_invoice(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_authorized_user)
 ):
-    invoice = db.query(Invoice).join(Order).filter(
+    invoice = db.query(Invoice).options(*INVOICE_RESPONSE).join(Order).filter(
         and_(
             Invoice.id == invoice_id,
-            Order.outlet_id.in_(get_authorized_outlet_ids(current_user, db))
+            get_outlet_scope(current_user, db).predicate(Order.outlet_id)
         )
     ).first()
     if not invoice:
@@ -259,11 +336,11 @@ async def list_invoices_by_order(
         logger.warning(f"Order {order_id} not found")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
     
-    if order.outlet_id not in get_authorized_outlet_ids(current_user, db):
+    if not get_outlet_scope(current_user, db).allows(order.outlet_id):
         logger.warning(f"User {current_user.id} attempted to list invoices for unauthorized order {order_id}")
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No permission for this order")
 
-    invoices = db.query(Invoice).filter(Invoice.order_id == order_id).all()
+    invoices = db.query(Invoice).options(*INVOICE_RESPONSE).filter(Invoice.order_id == order_id).all()
     logger.info(f"Retrieved {len(invoices)} invoices for order {order_id} by user {current_user.id}")
     return invoices
 
@@ -277,9 +354,9 @@ async def complete_payment(
         invoice = db.query(Invoice).join(Order).filter(
             and_(
                 Invoice.id == invoice_id,
-                Order.outlet_id.in_(get_authorized_outlet_ids(current_user, db))
+                get_outlet_scope(current_user, db).predicate(Order.outlet_id)
             )
-        ).first()
+        ).with_for_update(of=Invoice).first()  # Serialize payment so the sale is counted once
         if not invoice:
             logger.warning(f"Invoice {invoice_id} not found or unauthorized for user {current_user.id}")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invoice not found or unauthorized")
@@ -295,8 +372,10 @@ async def complete_payment(
                 payment.updated_at = datetime.utcnow()
 
         # Update invoice status
+        paid_at = datetime.utcnow()
         invoice.status = InvoiceStatus.COMPLETED.value
-        invoice.updated_at = datetime.utcnow()
+        invoice.paid_at = paid_at
+        invoice.updated_at = paid_at
 
         # Update order status
         order = invoice.order
@@ -309,19 +388,31 @@ async def complete_payment(
                 order.table.status = TableStatus.AVAILABLE.value
                 order.table.updated_at = datetime.utcnow()
 
+        # Count the sale in the outlet's daily rollup, atomically with the payment
+        record_invoice_sale(db, invoice, order.outlet_id, paid_at)
+
+        get_outbox(db).enqueue(notify_billing_update, {
+            "type": "invoice_paid",
+            "id": invoice.id,
+            "order_id": order.id,
+            "outlet_id": order.outlet_id,
+            "invoice_number": invoice.invoice_number,
+            "total_amount": invoice.total_amount
+        })
+        order_status_payload = {
+            "id": order.id,
+            "status": order.status,
+            "outlet_id": order.outlet_id
+        }
         db.commit()
-        db.refresh(invoice)
+        invoice = load_invoices(db, [invoice.id])[0]
         logger.info(f"Payment completed for invoice {invoice.id} by user {current_user.id}")
 
         # Notify order status update
         try:
-            await notify_order_status_update({
-                "id": order.id,
-                "status": order.status,
-                "outlet_id": order.outlet_id
-            })
+            await notify_order_status_update(order_status_payload)
         except Exception as e:
-            logger.warning(f"Failed to send order status notification for order {order.id}: {str(e)}")
+            logger.warning(f"Failed to send order status notification for order {order_status_payload['id']}: {str(e)}")
 
         return invoice
 
@@ -351,7 +442,7 @@ async def split_bill(
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
 
         # Check user permissions
-        if order.outlet_id not in get_authorized_outlet_ids(current_user, db):
+        if not get_outlet_scope(current_user, db).allows(order.outlet_id):
             logger.warning(f"User {current_user.id} attempted to split bill for unauthorized order {order.id}")
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No permission for this order")
 
@@ -366,111 +457,56 @@ async def split_bill(
             logger.warning(f"Invoice already exists for order {order.id}: invoice {existing_invoice.id}")
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invoice already exists for this order")
 
-        # Validate split type
-        if split_data.split_by not in ["items", "amount"]:
-            logger.warning(f"Invalid split type {split_data.split_by} for order {order.id}")
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Split type must be 'items' or 'amount'")
-
-        invoices = []
-        if split_data.split_by == "items":
-            # Validate item IDs
-            order_item_ids = {item.id for item in order.items}
-            split_item_ids = set()
-            for split in split_data.splits:
-                invalid_ids = set(split.item_ids) - order_item_ids
-                if invalid_ids:
-                    logger.warning(f"Invalid item IDs {invalid_ids} in split for order {order.id}")
-                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid item IDs: {invalid_ids}")
-                split_item_ids.update(split.item_ids)
-            
-            # Ensure all items are included
-            missing_ids = order_item_ids - split_item_ids
-            if missing_ids:
-                logger.warning(f"Missing item IDs {missing_ids} in split for order {order.id}")
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"All order items must be included in splits. Missing IDs: {missing_ids}")
-
-            # Calculate proportional tax and discount
-            total_subtotal = order.total_amount
-            total_discount = split_data.discount or 0.0
-            total_tax = split_data.tax or 0.0
-
-            for split in split_data.splits:
-                # Calculate subtotal for split
-                subtotal = sum(item.price * item.quantity for item in order.items if item.id in split.item_ids)
-                if subtotal == 0:
-                    logger.warning(f"Empty split (subtotal=0) for order {order.id}")
-                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Split cannot have zero subtotal")
-
-                # Proportional discount and tax
-                proportion = subtotal / total_subtotal if total_subtotal > 0 else 0
-                split_discount = total_discount * proportion
-                split_tax = total_tax * proportion
-                total_amount = subtotal - split_discount + split_tax
-
-                # Create invoice
-                invoice = Invoice(
-                    invoice_number=generate_invoice_number(db, order.outlet_id),
-                    order_id=order.id,
-                    subtotal=subtotal,
-                    discount=split_discount,
-                    tax=split_tax,
-                    total_amount=total_amount,
-                    status=InvoiceStatus.PENDING.value,
-                    created_by_id=current_user.id
-                )
-                db.add(invoice)
-                db.flush()
-
-                # Create split bill record
-                split_bill = SplitBill(
-                    invoice_id=invoice.id,
-                    split_type=split_data.split_by,
-                    split_data=json.dumps({"item_ids": split.item_ids})
-                )
-                db.add(split_bill)
-                invoices.append(invoice)
-
-        elif split_data.split_by == "amount":
-            # Validate split amounts
-            total_split_amount = sum(split.amount for split in split_data.splits)
-            expected_total = order.total_amount - (split_data.discount or 0.0) + (split_data.tax or 0.0)
-            if total_split_amount != expected_total:
-                logger.warning(f"Split amounts {total_split_amount} do not match expected total {expected_total} for order {order.id}")
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Split amounts must equal the order total minus discount plus tax")
-
-            for split in split_data.splits:
-                if split.amount <= 0:
-                    logger.warning(f"Invalid split amount {split.amount} for order {order.id}")
-                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Split amount must be positive")
-
-                # Create invoice
-                invoice = Invoice(
-                    invoice_number=generate_invoice_number(db, order.outlet_id),
-                    order_id=order.id,
-                    subtotal=split.amount,
-                    discount=0.0,  # Discount applied at order level
-                    tax=0.0,      # Tax applied at order level
-                    total_amount=split.amount,
-                    status=InvoiceStatus.PENDING.value,
-                    created_by_id=current_user.id
-                )
-                db.add(invoice)
-                db.flush()
-
-                # Create split bill record
-                split_bill = SplitBill(
-                    invoice_id=invoice.id,
-                    split_type=split_data.split_by,
-                    split_data=json.dumps({"amount": split.amount})
-                )
-                db.add(split_bill)
-                invoices.append(invoice)
+        # Compute every split in one pass over the order lines
+        order_lines = [
+            OrderLine(id=line.id, price=line.price, quantity=line.quantity, seat_number=line.seat_number)
+            for line in db.query(OrderItem.id, OrderItem.price, OrderItem.quantity, OrderItem.seat_number).filter(
+                OrderItem.order_id == order.id
+            )
+        ]
+        try:
+            if split_data.split_by == "items":
+                shares = split_by_items(order_lines, [split.item_ids for split in split_data.splits], split_data.discount, split_data.tax)
+            elif split_data.split_by == "amount":
+                shares = split_by_amount(order.total_amount, [split.amount for split in split_data.splits], split_data.discount, split_data.tax)
+            elif split_data.split_by == "equal":
+                shares = split_equally(order.total_amount, split_data.parts, split_data.discount, split_data.tax)
+            else:
+                shares = split_by_seat(order_lines, split_data.discount, split_data.tax)
+        except SplitError as e:
+            logger.warning(f"Invalid {split_data.split_by} split for order {order.id}: {str(e)}")
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        # Persist all invoices and split records in bulk
+        invoice_numbers = reserve_invoice_numbers(db, order.outlet_id, len(shares))
+        invoice_ids = db.scalars(
+            insert(Invoice).returning(Invoice.id, sort_by_parameter_order=True),
+            [
+                {
+                    "invoice_number": invoice_number,
+                    "order_id": order.id,
+                    "subtotal": to_major(share.subtotal),
+                    "discount": to_major(share.discount),
+                    "tax": to_major(share.tax),
+                    "total_amount": to_major(share.total),
+                    "status": InvoiceStatus.PENDING.value,
+                    "created_by_id": current_user.id
+                }
+                for share, invoice_number in zip(shares, invoice_numbers)
+            ]
+        ).all()
+        db.execute(insert(SplitBill), [
+            {
+                "invoice_id": invoice_id,
+                "split_type": split_data.split_by,
+                "split_data": json.dumps(share.detail)
+            }
+            for share, invoice_id in zip(shares, invoice_ids)
+        ])
 
         db.commit()
-        for invoice in invoices:
-            db.refresh(invoice)
-        logger.info(f"Created {len(invoices)} split invoices for order {order.id} by user {current_user.id}")
-        return invoices
+        logger.info(f"Created {len(invoice_ids)} split invoices for order {split_data.order_id} by user {current_user.id}")
+        return load_invoices(db, invoice_ids)
 
     except HTTPException as e:
         db.rollback()
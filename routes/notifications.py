@@ -1,41 +1,15 @@
 import logging
-from fastapi import WebSocket, WebSocketDisconnect,APIRouter,Depends
-from typing import Dict, List
-from sqlalchemy.orm import Session
-from utils.database import get_db
-from models.restaurant_outlet import RestaurantOutlet
+from typing import Optional
+from fastapi import WebSocket,APIRouter,Depends,HTTPException,status
+from models.user import User, UserRole
+from utils.auth import get_current_active_user
+from utils.event_backplane import backplane
+from utils.outlet_scope import outlet_index
+from utils.websocket_broker import ALL_TOPICS, ENCODING_JSON, TOPIC_BILLING, TOPIC_KOT, TOPIC_ORDER_STATUS, broker
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1/notifications", tags=["notifications"])
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[int, List[WebSocket]] = {}  
-
-    async def connect(self, websocket: WebSocket, outlet_id: int):
-        await websocket.accept()
-        if outlet_id not in self.active_connections:
-            self.active_connections[outlet_id] = []
-        self.active_connections[outlet_id].append(websocket)
-        logger.debug(f"WebSocket connected for outlet {outlet_id}. Total connections: {len(self.active_connections[outlet_id])}")
-
-    def disconnect(self, websocket: WebSocket, outlet_id: int):
-        if outlet_id in self.active_connections:
-            self.active_connections[outlet_id].remove(websocket)
-            if not self.active_connections[outlet_id]:
-                del self.active_connections[outlet_id]
-            logger.debug(f"WebSocket disconnected for outlet {outlet_id}. Total connections: {len(self.active_connections.get(outlet_id, []))}")
-
-    async def broadcast(self, message: dict, outlet_id: int):
-        if outlet_id in self.active_connections:
-            for connection in self.active_connections[outlet_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.warning(f"Failed to send WebSocket message to outlet {outlet_id}: {str(e)}")
-
-connection_manager = ConnectionManager()
-
 async def notify_order_status_update(data: dict):
     outlet_id = data.get("outlet_id")
     if not outlet_id:
@@ -44,7 +18,7 @@ async def notify_order_status_update(data: dict):
 
     logger.debug(f"Sending order status update for outlet {outlet_id}: {data}")
     try:
-        await connection_manager.broadcast(data, outlet_id)
+        backplane.publish(TOPIC_ORDER_STATUS, outlet_id, data)
     except Exception as e:
         logger.warning(f"Failed to broadcast order status update for outlet {outlet_id}: {str(e)}")
 
@@ -56,7 +30,7 @@ async def notify_kitchen_new_kot(data: dict):
 
     logger.debug(f"Sending KOT notification for outlet {outlet_id}: {data}")
     try:
-        await connection_manager.broadcast(data, outlet_id)
+        backplane.publish(TOPIC_KOT, outlet_id, data)
     except Exception as e:
         logger.warning(f"Failed to broadcast KOT notification for outlet {outlet_id}: {str(e)}")
 
@@ -68,27 +42,46 @@ async def notify_kot_status_update(data: dict):
 
     logger.debug(f"Sending KOT status update for outlet {outlet_id}: {data}")
     try:
-        await connection_manager.broadcast(data, outlet_id)
+        backplane.publish(TOPIC_KOT, outlet_id, data)
     except Exception as e:
         logger.warning(f"Failed to broadcast KOT status update for outlet {outlet_id}: {str(e)}")
 
-@router.websocket("/ws/{outlet_id}")
-async def websocket_notifications(websocket: WebSocket, outlet_id: int, db: Session = Depends(get_db)):
-    outlet = db.query(RestaurantOutlet).filter(RestaurantOutlet.id == outlet_id).first()
-    if not outlet:
-        await websocket.close(code=4000, reason="Invalid outlet ID")
+async def notify_billing_update(data: dict):
+    outlet_id = data.get("outlet_id")
+    if not outlet_id:
+        logger.warning("No outlet_id provided in notify_billing_update")
         return
 
+    logger.debug(f"Sending billing update for outlet {outlet_id}: {data}")
     try:
-        await connection_manager.connect(websocket, outlet_id)
-        while True:
-            await websocket.receive_text()  
-    except WebSocketDisconnect:
-        connection_manager.disconnect(websocket, outlet_id)
+        backplane.publish(TOPIC_BILLING, outlet_id, data)
     except Exception as e:
-        logger.error(f"WebSocket error for outlet {outlet_id}: {str(e)}")
-        connection_manager.disconnect(websocket, outlet_id)
-        await websocket.close(code=4000, reason=str(e))
+        logger.warning(f"Failed to broadcast billing update for outlet {outlet_id}: {str(e)}")
+
+@router.websocket("/ws/{outlet_id}")
+async def websocket_notifications(
+    websocket: WebSocket,
+    outlet_id: int,
+    since: Optional[int] = None,
+    encoding: str = ENCODING_JSON,
+    heartbeat: bool = False
+):
+    # Validate against the cached outlet index, so no pooled connection is held while the socket is open
+    if not await outlet_index.contains(outlet_id):
+        await websocket.close(code=4000, reason="Invalid outlet ID")
+        return
+
+    # Order status, KOT and billing events; a reconnecting client passes the last seq it saw as ?since=,
+    # ?encoding= picks json (text frames), json.deflate or msgpack (binary frames), and with
+    # ?heartbeat=true the client also gets {"type": "ping"} frames when idle and must answer "pong"
+    await broker.serve(websocket, outlet_id, ALL_TOPICS, since, encoding, heartbeat)
+
+@router.get("/stats")
+async def get_notification_stats(current_user: User = Depends(get_current_active_user)):
+    """Live connection counts, evictions and send latency for this worker's WebSockets."""
+    if current_user.role != UserRole.SUPERADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only superadmins can view notification stats")
+    return broker.metrics()
 
 @router.post("/test-broadcast")
 async def test_broadcast(data: dict):
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status,Request
+from fastapi import APIRouter, Depends, HTTPException, Query, status,Request
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, case, cast, func, insert, literal, select, tuple_, update
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from routes.notifications import notify_kitchen_new_kot, notify_order_status_update,notify_kot_status_update
 
@@ -15,10 +16,14 @@ from models.restaurant_outlet import RestaurantOutlet
 from schemas.order_management import (
     OrderCreate,
     OrderResponse,
+    OrderListResponse,
     OrderStatusUpdate,
     OrderItemCreate,
     KOTResponse,
     KOTStatusUpdate,
+    KOTBulkStatusUpdate,
+    KitchenKOTResponse,
+    KitchenQueueResponse,
     OrderType,
     OrderStatus
 )
@@ -27,6 +32,12 @@ from schemas.user import (
 )
 
 from utils.auth import get_current_active_user
+from utils.outlet_scope import get_outlet_scope
+from utils.token_allocator import token_allocator
+from utils.event_outbox import get_outbox
+from utils.pagination import encode_cursor, decode_cursor
+from utils.loader_profiles import ORDER_RESPONSE, load_order
+from utils.escpos import ESCPOS_MEDIA_TYPE, KOTTicket, render_kot_escpos
 
 
 
@@ -55,39 +66,90 @@ def get_kot_authorized_user(current_user: User = Depends(get_current_active_user
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions for KOT management")
     return current_user
 
-# Helper to get authorized outlet IDs
-def get_authorized_outlet_ids(current_user: User, db: Session) -> List[int]:
-    if current_user.role == UserRole.SUPERADMIN:
-        return [outlet.id for outlet in db.query(RestaurantOutlet).all()]
-    elif current_user.role == UserRole.OWNER:
-        chain_ids = [chain.id for chain in current_user.restaurant_chains]
-        return [outlet.id for outlet in db.query(RestaurantOutlet).filter(RestaurantOutlet.chain_id.in_(chain_ids)).all()]
-    elif current_user.role in [UserRole.MANAGER, UserRole.WAITER, UserRole.KITCHEN]:
-        if not current_user.outlet:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not assigned to any outlet")
-        return [current_user.outlet.id]
-    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid user role")
-
-
-def generate_token_number(db: Session, outlet_id: int) -> str:
-    print("Generating token number for outlet ID:", outlet_id)
-    outlet = db.query(RestaurantOutlet).filter(RestaurantOutlet.id == outlet_id).first()
-    if not outlet:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Outlet not found")
-    
-    latest_order = db.query(Order).filter(Order.outlet_id == outlet_id).order_by(Order.id.desc()).first()
-    
-    if latest_order is None or latest_order.token_number is None:
-        return f"O{outlet_id}-TKN-001"
-    
-    try:
-        latest_num = int(latest_order.token_number.split('-')[-1])
-        return f"O{outlet_id}-TKN-{latest_num + 1:03d}"
-    except (IndexError, ValueError):
-        logger.error(f"Invalid token number format: {latest_order.token_number} for outlet {outlet_id}")
-        return f"O{outlet_id}-TKN-001"
-    
+# Resolve all requested menu items with a single IN query
+def resolve_menu_items(db: Session, outlet_id: int, menu_item_ids: List[int]) -> Dict[int, MenuItem]:
+    outlet_chain_id = select(RestaurantOutlet.chain_id).where(RestaurantOutlet.id == outlet_id).scalar_subquery()
+    menu_items = db.query(MenuItem).join(MenuCategory).filter(
+        and_(
+            MenuItem.id.in_(set(menu_item_ids)),
+            MenuItem.is_available == True,
+            or_(
+                MenuCategory.outlet_id == outlet_id,
+                MenuCategory.chain_id == outlet_chain_id
+            )
+        )
+    ).all()
+    menu_items_by_id = {menu_item.id: menu_item for menu_item in menu_items}
 
+    for menu_item_id in menu_item_ids:
+        if menu_item_id not in menu_items_by_id:
+            logger.warning(f"Menu item {menu_item_id} not found or unavailable for outlet {outlet_id}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Menu item ID {menu_item_id} not found, inactive, or not associated with outlet ID {outlet_id}"
+            )
+    return menu_items_by_id
+
+# Bulk-insert order items and their KOTs, returning the created KOT payloads
+def insert_order_lines(db: Session, order: Order, items: List[OrderItemCreate], menu_items: Dict[int, MenuItem]) -> List[dict]:
+    if not items:
+        return []  # An executemany INSERT with no rows would insert a row of defaults
+    item_rows = [
+        {
+            "order_id": order.id,
+            "menu_item_id": item.menu_item_id,
+            "quantity": item.quantity,
+            "price": menu_items[item.menu_item_id].price,
+            "notes": item.notes,
+            "seat_number": item.seat_number
+        }
+        for item in items
+    ]
+    order_item_ids = db.scalars(
+        insert(OrderItem).returning(OrderItem.id, sort_by_parameter_order=True),
+        item_rows
+    ).all()
+
+    kot_ids = db.scalars(
+        insert(KOT).returning(KOT.id, sort_by_parameter_order=True),
+        [
+            {"order_item_id": order_item_id, "outlet_id": order.outlet_id, "status": KOTStatus.PENDING.value}
+            for order_item_id in order_item_ids
+        ]
+    ).all()
+
+    order.total_amount = (order.total_amount or 0.0) + sum(row["price"] * row["quantity"] for row in item_rows)
+    order.kots_total = Order.kots_total + len(kot_ids)
+    order.kots_pending = Order.kots_pending + len(kot_ids)
+
+    return [
+        {
+            "outlet_id": order.outlet_id,
+            "id": kot_id,
+            "order_id": order.id,
+            "item_name": menu_items[item.menu_item_id].name,
+            "quantity": item.quantity,
+            "notes": item.notes
+        }
+        for kot_id, item in zip(kot_ids, items)
+    ]
+
+# Queue one "order + N KOTs" kitchen notification, published after commit
+def queue_kitchen_notification(db: Session, order: Order, kot_payloads: List[dict]):
+    get_outbox(db).enqueue(
+        notify_kitchen_new_kot,
+        {
+            "type": "new_kots",
+            "outlet_id": order.outlet_id,
+            "order_id": order.id,
+            "token_number": order.token_number,
+            "table_id": order.table_id,
+            "timestamp": datetime.utcnow().isoformat()
+        },
+        key=("new_kots", order.outlet_id, order.id),
+        items_key="kots",
+        items=kot_payloads
+    )
 
 # Validate KOT status transition
 def validate_kot_status_transition(current_status: KOTStatus, new_status: KOTStatus):
@@ -104,34 +166,73 @@ def validate_kot_status_transition(current_status: KOTStatus, new_status: KOTSta
             detail=f"Invalid KOT status transition from {current_status} to {new_status}"
         )
 
-# Update order status based on KOT statuses
-def update_order_status(db: Session, order: Order):
-    kots = db.query(KOT).filter(KOT.order_item_id.in_(
-        db.query(OrderItem.id).filter(OrderItem.order_id == order.id)
-    )).all()
-    
-    if not kots:
-        return
-    
-    kot_statuses = [kot.status for kot in kots]
-    if all(status == KOTStatus.COMPLETED.value for status in kot_statuses):
-        order.status = OrderStatus.COMPLETED.value
-    elif all(status == KOTStatus.READY.value for status in kot_statuses):
-        order.status = OrderStatus.READY.value
-    elif any(status == KOTStatus.PREPARING.value for status in kot_statuses):
-        order.status = OrderStatus.PREPARING.value
-    elif any(status == KOTStatus.CANCELLED.value for status in kot_statuses):
-        if all(status in [KOTStatus.CANCELLED.value, KOTStatus.COMPLETED.value] for status in kot_statuses):
-            order.status = OrderStatus.CANCELLED.value
-    order.updated_at = datetime.utcnow()
-    
+# KOT status -> Order counter column
+KOT_COUNTER_COLUMNS = {
+    KOTStatus.PENDING.value: "kots_pending",
+    KOTStatus.PREPARING.value: "kots_preparing",
+    KOTStatus.READY.value: "kots_ready",
+    KOTStatus.COMPLETED.value: "kots_completed",
+    KOTStatus.CANCELLED.value: "kots_cancelled"
+}
+
+# Recount an order's KOT counters from its KOTs (orders created before the counters existed)
+def rebuild_kot_counters(db: Session, order: Order):
+    counts = dict(
+        db.query(KOT.status, func.count(KOT.id)).join(OrderItem).filter(
+            OrderItem.order_id == order.id
+        ).group_by(KOT.status).all()
+    )
+    for kot_status, column in KOT_COUNTER_COLUMNS.items():
+        setattr(order, column, counts.get(KOTStatus(kot_status), 0))
+    order.kots_total = sum(counts.values())
+    db.flush()
+
+# Apply KOT status deltas to an order's counters and derive order and table status in one statement
+def apply_kot_counter_deltas(db: Session, order_id: int, deltas: Dict[str, int]):
+    counters = {
+        column: getattr(Order, column) + deltas.get(kot_status, 0)
+        for kot_status, column in KOT_COUNTER_COLUMNS.items()
+    }
+    order_status_type = Order.__table__.c.status.type
+    new_status = case(
+        (counters["kots_completed"] == Order.kots_total, literal(OrderStatus.COMPLETED.value, order_status_type)),
+        (counters["kots_ready"] == Order.kots_total, literal(OrderStatus.READY.value, order_status_type)),
+        (counters["kots_preparing"] > 0, literal(OrderStatus.PREPARING.value, order_status_type)),
+        (
+            and_(counters["kots_cancelled"] > 0, counters["kots_cancelled"] + counters["kots_completed"] == Order.kots_total),
+            literal(OrderStatus.CANCELLED.value, order_status_type)
+        ),
+        else_=Order.status
+    )
+    updated_order = update(Order).where(
+        and_(Order.id == order_id, Order.kots_total > 0)
+    ).values(
+        **counters, status=new_status, updated_at=datetime.utcnow()
+    ).returning(
+        Order.id, Order.outlet_id, Order.status, Order.table_id, Order.order_type
+    ).cte("updated_order")
+
     # Update table status for dine-in orders
-    if order.order_type == OrderType.DINE_IN.value and order.table:
-        if order.status in [OrderStatus.COMPLETED.value, OrderStatus.CANCELLED.value]:
-            order.table.status = TableStatus.AVAILABLE.value
-        else:
-            order.table.status = TableStatus.OCCUPIED.value
-        order.table.updated_at = datetime.utcnow()
+    table_status_type = Table.__table__.c.status.type
+    updated_table = update(Table).where(
+        and_(
+            Table.id == updated_order.c.table_id,
+            updated_order.c.order_type == OrderType.DINE_IN.value
+        )
+    ).values(
+        status=cast(case(
+            (
+                updated_order.c.status.in_([OrderStatus.COMPLETED.value, OrderStatus.CANCELLED.value]),
+                literal(TableStatus.AVAILABLE.value, table_status_type)
+            ),
+            else_=literal(TableStatus.OCCUPIED.value, table_status_type)
+        ), table_status_type),
+        updated_at=func.now()
+    ).returning(Table.id).cte("updated_table")
+
+    return db.execute(
+        select(updated_order.c.id, updated_order.c.outlet_id, updated_order.c.status).add_cte(updated_table)
+    ).first()
 
 # Order Endpoints
 @router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
@@ -145,8 +246,7 @@ async def create_order(
     logger.debug(f"Parsed OrderCreate: {order.dict()}")
     try:
         # Validate outlet permissions
-        authorized_outlet_ids = get_authorized_outlet_ids(current_user, db)
-        if order.outlet_id not in authorized_outlet_ids:
+        if not get_outlet_scope(current_user, db).allows(order.outlet_id):
             logger.warning(f"User {current_user.id} attempted to create order for unauthorized outlet {order.outlet_id}")
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -169,11 +269,13 @@ async def create_order(
                     detail=f"Table ID {order.table_id} is invalid, not associated with outlet ID {order.outlet_id}, or unavailable"
                 )
 
+        # Resolve all menu items up front
+        menu_items = resolve_menu_items(db, order.outlet_id, [item.menu_item_id for item in order.items])
+
         # Generate token number
-        token_number = generate_token_number(db, order.outlet_id)
+        token_number = token_allocator.next_token(order.outlet_id)
 
         # Create order
-        total_amount = 0.0
         logger.debug(f"Creating order with order_type={order.order_type}, type={type(order.order_type)}")
         db_order = Order(
             token_number=token_number,
@@ -181,69 +283,22 @@ async def create_order(
             table_id=order.table_id,
             order_type=order.order_type,  # Use string directly, not .value
             status=OrderStatus.PENDING.value,
+            total_amount=0.0,
             # created_by_id=current_user.id
         )
         db.add(db_order)
         db.flush()
 
-        # Process order items
-        for item in order.items:
-            menu_item = db.query(MenuItem).filter(
-                and_(
-                    MenuItem.id == item.menu_item_id,
-                    # MenuItem.outlet_id == order.outlet_id,
-                    MenuItem.is_available == True
-                )
-            ).first()
-            if not menu_item:
-                logger.warning(f"Menu item {item.menu_item_id} not found or unavailable for outlet {order.outlet_id}")
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Menu item ID {item.menu_item_id} not found, inactive, or not associated with outlet ID {order.outlet_id}"
-                )
-
-            item_total = menu_item.price * item.quantity
-            total_amount += item_total
+        # Process order items and KOTs in bulk
+        kot_payloads = insert_order_lines(db, db_order, order.items, menu_items)
+        queue_kitchen_notification(db, db_order, kot_payloads)
 
-            db_item = OrderItem(
-                order_id=db_order.id,
-                menu_item_id=item.menu_item_id,
-                quantity=item.quantity,
-                price=menu_item.price,
-                notes=item.notes
-            )
-            db.add(db_item)
-            db.flush()
-
-            db_kot = KOT(
-                order_item_id=db_item.id,
-                status=KOTStatus.PENDING.value
-            )
-            
-            db.add(db_kot)
-            db.flush()
-            try:
-                await notify_kitchen_new_kot({
-                    "outlet_id": db_order.outlet_id,  
-                    "id": db_kot.id,
-                    "order_id": db_order.id,
-                    "item_name": menu_item.name,
-                    "quantity": item.quantity,
-                    "notes": item.notes,
-                    "timestamp": datetime.utcnow().isoformat()
-                })
-                logger.debug(f"Sent KOT notification for KOT {db_kot.id} for order {db_order.id}")
-            except Exception as e:
-                logger.warning(f"Failed to send KOT notification for KOT {db_kot.id}: {str(e)}")
-
-        # Update order total and table status
-        db_order.total_amount = total_amount
+        # Update table status
         if order.table_id:
             table.status = 'occupied'
         db.commit()
-        db.refresh(db_order)
         logger.info(f"Order {db_order.id} created by user {current_user.id} for outlet {order.outlet_id}")
-        return db_order
+        return load_order(db, db_order.id)
 
     except HTTPException as e:
         db.rollback()
@@ -259,16 +314,67 @@ async def create_order(
 
  
     
+@router.get("", response_model=OrderListResponse)
+async def list_orders(
+    outlet_id: Optional[int] = None,
+    order_status: Optional[OrderStatus] = Query(None, alias="status"),
+    order_type: Optional[OrderType] = None,
+    table_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_authorized_user)
+):
+    scope = get_outlet_scope(current_user, db)
+    if outlet_id is not None and not scope.allows(outlet_id):
+        logger.warning(f"User {current_user.id} attempted to list orders for unauthorized outlet {outlet_id}")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No permission for this outlet")
+
+    # Newest first, keyset-paginated on (created_at, id)
+    query = db.query(Order).options(*ORDER_RESPONSE)
+    if outlet_id is not None:
+        query = query.filter(Order.outlet_id == outlet_id)
+    else:
+        query = query.filter(scope.predicate(Order.outlet_id))
+    if order_status:
+        query = query.filter(Order.status == order_status.value)
+    if order_type:
+        query = query.filter(Order.order_type == order_type.value)
+    if table_id is not None:
+        query = query.filter(Order.table_id == table_id)
+    if created_from:
+        query = query.filter(Order.created_at >= created_from)
+    if created_to:
+        query = query.filter(Order.created_at < created_to)
+
+    position = decode_cursor(cursor)
+    if position:
+        query = query.filter(tuple_(Order.created_at, Order.id) < position)
+
+    orders = query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor(orders[-1].created_at, orders[-1].id)
+
+    logger.info(f"Listed {len(orders)} orders for user {current_user.id}")
+    return OrderListResponse(
+        items=[OrderResponse.model_validate(order) for order in orders],
+        next_cursor=next_cursor
+    )
+
 @router.get("/{order_id}", response_model=OrderResponse)
 async def get_order(
     order_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_authorized_user)
 ):
-    order = db.query(Order).filter(
+    order = db.query(Order).options(*ORDER_RESPONSE).filter(
         and_(
             Order.id == order_id,
-            Order.outlet_id.in_(get_authorized_outlet_ids(current_user, db))
+            get_outlet_scope(current_user, db).predicate(Order.outlet_id)
         )
     ).first()
     if not order:
@@ -281,10 +387,10 @@ async def get_order_by_token(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_authorized_user)
 ):
-    order = db.query(Order).filter(
+    order = db.query(Order).options(*ORDER_RESPONSE).filter(
         and_(
             Order.token_number == token_number,
-            Order.outlet_id.in_(get_authorized_outlet_ids(current_user, db))
+            get_outlet_scope(current_user, db).predicate(Order.outlet_id)
         )
     ).first()
     if not order:
@@ -302,7 +408,7 @@ async def update_order_status(
         order = db.query(Order).filter(
             and_(
                 Order.id == order_id,
-                Order.outlet_id.in_(get_authorized_outlet_ids(current_user, db))
+                get_outlet_scope(current_user, db).predicate(Order.outlet_id)
             )
         ).first()
         if not order:
@@ -334,7 +440,7 @@ async def update_order_status(
                 table.status = 'occupied'
 
         db.commit()
-        db.refresh(order)
+        order = load_order(db, order.id)
         await notify_order_status_update({
             "id": order.id,
             "status": order.status,
@@ -362,7 +468,7 @@ async def add_order_items(
         order = db.query(Order).filter(
             and_(
                 Order.id == order_id,
-                Order.outlet_id.in_(get_authorized_outlet_ids(current_user, db))
+                get_outlet_scope(current_user, db).predicate(Order.outlet_id)
             )
         ).first()
         if not order:
@@ -375,76 +481,24 @@ async def add_order_items(
             )
         
 
-        # Validate outlet
-        outlet = db.query(RestaurantOutlet).filter(RestaurantOutlet.id == order.outlet_id).first()
-        if not outlet:
-            logger.warning(f"Outlet {order.outlet_id} not found for order {order_id}")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Outlet ID {order.outlet_id} not found")
-
-        # Process order items and KOTs
-        new_kots = []
-        for item in items:
-            # Validate menu item
-            menu_item = db.query(MenuItem).join(MenuCategory).filter(
-                and_(
-                    MenuItem.id == item.menu_item_id,
-                    MenuItem.is_available == True,
-                    or_(
-                        MenuCategory.outlet_id == order.outlet_id,
-                        MenuCategory.chain_id == outlet.chain_id
-                    )
-                )
-            ).first()
-            if not menu_item:
-                logger.warning(f"Menu item {item.menu_item_id} not found or unavailable for outlet {order.outlet_id}")
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Menu item ID {item.menu_item_id} not found, inactive, or not associated with outlet ID {order.outlet_id}"
-                )
+        # Resolve all menu items up front
+        menu_items = resolve_menu_items(db, order.outlet_id, [item.menu_item_id for item in items])
 
-            # Create OrderItem
-            db_item = OrderItem(
-                order_id=order.id,
-                menu_item_id=item.menu_item_id,
-                quantity=item.quantity,
-                price=menu_item.price,
-                notes=item.notes
-            )
-            db.add(db_item)
-            db.flush()
+        # Count the existing KOTs first on orders created before the counters existed,
+        # otherwise the counters would only cover the KOTs added here
+        if items and not order.kots_total:
+            rebuild_kot_counters(db, order)
 
-            # Create KOT
-            db_kot = KOT(
-                order_item_id=db_item.id,
-                status=KOTStatus.PENDING
-            )
-            db.add(db_kot)
-            db.flush()
-            new_kots.append(db_kot)
-
-            # Update order total
-            order.total_amount += menu_item.price * item.quantity
-
-            # Send KOT notification
-            try:
-                await notify_kitchen_new_kot({
-                    "outlet_id": order.outlet_id,  # Include outlet_id
-                    "id": db_kot.id,
-                    "order_id": order.id,
-                    "item_name": menu_item.name,
-                    "quantity": item.quantity,
-                    "notes": item.notes,
-                    "timestamp": datetime.utcnow().isoformat()
-                })
-                logger.debug(f"Sent KOT notification for KOT {db_kot.id} for order {order.id}")
-            except Exception as e:
-                logger.warning(f"Failed to send KOT notification for KOT {db_kot.id}: {str(e)}")
+        # Process order items and KOTs in bulk
+        new_kots = insert_order_lines(db, order, items, menu_items)
+        if new_kots:
+            queue_kitchen_notification(db, order, new_kots)
 
         # Update order and table status
         order.updated_at = datetime.utcnow()
         order.update_table_status(db)  # Update table status
         db.commit()
-        db.refresh(order)
+        order = load_order(db, order.id)
 
         logger.info(f"Added {len(items)} items to order {order_id} by user {current_user.id} with {len(new_kots)} KOTs")
         return order
@@ -472,9 +526,9 @@ async def update_kot_status(
             and_(
                 KOT.id == kot_id,
                 OrderItem.order_id == order_id,
-                Order.outlet_id.in_(get_authorized_outlet_ids(current_user, db))
+                get_outlet_scope(current_user, db).predicate(Order.outlet_id)
             )
-        ).first()
+        ).with_for_update(of=KOT).first()
         if not kot:
             logger.warning(f"KOT {kot_id} not found or unauthorized for order {order_id} by user {current_user.id}")
             raise HTTPException(
@@ -491,30 +545,32 @@ async def update_kot_status(
             )
 
         # Validate status transition
-        validate_kot_status_transition(kot.status, status_update.status)
+        previous_status = kot.status
+        validate_kot_status_transition(previous_status, status_update.status)
+
+        order = kot.order_item.order
+        if not order.kots_total:
+            rebuild_kot_counters(db, order)
 
         # Update KOT status
         kot.status = status_update.status
         kot.updated_at = datetime.utcnow()
         db.flush()
 
-        # Update order status based on KOTs
-        order = kot.order_item.order
-        update_order_status(db, order)
-
-        # Notify kitchen of KOT status update
-        try:
-            await notify_kot_status_update({
-                "id": kot.id,
-                "status": kot.status,
-                "order_id": order.id,
-                "outlet_id": order.outlet_id,
-                "item_name": kot.order_item.menu_item.name,
-                "quantity": kot.order_item.quantity,
-                "notes": kot.order_item.notes
-            })
-        except Exception as e:
-            logger.warning(f"Failed to send KOT status notification for KOT {kot.id}: {str(e)}")
+        # Update order and table status from the KOT counters
+        apply_kot_counter_deltas(db, order.id, {previous_status.value: -1, status_update.status.value: 1})
+        db.expire(order)
+
+        # Notify kitchen of KOT status update once committed
+        get_outbox(db).enqueue(notify_kot_status_update, {
+            "id": kot.id,
+            "status": kot.status,
+            "order_id": order.id,
+            "outlet_id": order.outlet_id,
+            "item_name": kot.order_item.menu_item.name,
+            "quantity": kot.order_item.quantity,
+            "notes": kot.order_item.notes
+        })
 
         db.commit()
         db.refresh(kot)
@@ -533,6 +589,142 @@ async def update_kot_status(
             detail=f"Failed to update KOT status: {str(e)}"
         )
 
+@router.post("/outlet/{outlet_id}/kots/bulk-status", response_model=List[KOTResponse])
+async def bulk_update_kot_status(
+    outlet_id: int,
+    bulk_update: KOTBulkStatusUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_kot_authorized_user)
+):
+    try:
+        if not get_outlet_scope(current_user, db).allows(outlet_id):
+            logger.warning(f"User {current_user.id} attempted to bulk update KOTs for unauthorized outlet {outlet_id}")
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No permission for this outlet")
+
+        requested = {update_item.kot_id: update_item.status for update_item in bulk_update.updates}
+        if len(requested) != len(bulk_update.updates):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Each KOT may appear only once per bulk update")
+
+        # Restrict cancellation to managers or above
+        if KOTStatus.CANCELLED.value in requested.values() and current_user.role not in [UserRole.SUPERADMIN, UserRole.OWNER, UserRole.MANAGER]:
+            logger.warning(f"User {current_user.id} attempted to cancel KOTs without permission")
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only managers or above can cancel KOTs"
+            )
+
+        # Lock and validate every KOT before changing any of them
+        rows = db.query(KOT, OrderItem.order_id).join(OrderItem).filter(
+            and_(
+                KOT.id.in_(requested.keys()),
+                KOT.outlet_id == outlet_id
+            )
+        ).with_for_update(of=KOT).all()
+        missing_ids = set(requested) - {kot.id for kot, _ in rows}
+        if missing_ids:
+            logger.warning(f"KOTs {missing_ids} not found for outlet {outlet_id} in bulk update by user {current_user.id}")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"KOTs not found for this outlet: {sorted(missing_ids)}")
+
+        deltas_by_order: Dict[int, Dict[str, int]] = {}
+        for kot, order_id in rows:
+            new_status = requested[kot.id]
+            validate_kot_status_transition(kot.status, new_status)
+            deltas = deltas_by_order.setdefault(order_id, {})
+            deltas[kot.status.value] = deltas.get(kot.status.value, 0) - 1
+            deltas[new_status.value] = deltas.get(new_status.value, 0) + 1
+
+        for order in db.query(Order).filter(and_(Order.id.in_(deltas_by_order.keys()), Order.kots_total == 0)).all():
+            rebuild_kot_counters(db, order)
+
+        # Apply all transitions, then recompute each affected order once
+        now = datetime.utcnow()
+        db.execute(update(KOT), [
+            {"id": kot.id, "status": requested[kot.id].value, "updated_at": now}
+            for kot, _ in rows
+        ])
+        order_statuses = [
+            apply_kot_counter_deltas(db, order_id, deltas)
+            for order_id, deltas in deltas_by_order.items()
+        ]
+
+        get_outbox(db).enqueue(notify_kot_status_update, {
+            "type": "kot_bulk_status",
+            "outlet_id": outlet_id,
+            "kots": [
+                {"id": kot.id, "order_id": order_id, "status": requested[kot.id].value}
+                for kot, order_id in rows
+            ],
+            "orders": [
+                {"id": order_status.id, "status": order_status.status}
+                for order_status in order_statuses if order_status
+            ],
+            "timestamp": now.isoformat()
+        })
+
+        db.commit()
+        kots = db.query(KOT).filter(KOT.id.in_(requested.keys())).order_by(KOT.id).all()
+        logger.info(f"Bulk updated {len(kots)} KOTs across {len(deltas_by_order)} orders for outlet {outlet_id} by user {current_user.id}")
+        return kots
+
+    except HTTPException as e:
+        db.rollback()
+        logger.warning(f"Validation error for bulk KOT status update by user {current_user.id}: {e.detail}")
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error bulk updating KOT status for outlet {outlet_id} by user {current_user.id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to update KOT status: {str(e)}"
+        )
+
+@router.get("/{order_id}/kots/{kot_id}/print")
+async def print_kot(
+    order_id: int,
+    kot_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_kot_authorized_user)
+):
+    row = db.query(
+        KOT.id,
+        Order.token_number,
+        Order.order_type,
+        Table.name.label("table_name"),
+        MenuItem.name.label("item_name"),
+        OrderItem.quantity,
+        OrderItem.notes,
+        KOT.created_at
+    ).join(OrderItem, KOT.order_item_id == OrderItem.id).join(
+        Order, OrderItem.order_id == Order.id
+    ).join(MenuItem, OrderItem.menu_item_id == MenuItem.id).outerjoin(
+        Table, Order.table_id == Table.id
+    ).filter(
+        and_(
+            KOT.id == kot_id,
+            Order.id == order_id,
+            get_outlet_scope(current_user, db).predicate(Order.outlet_id)
+        )
+    ).first()
+    if not row:
+        logger.warning(f"KOT {kot_id} not found or unauthorized for order {order_id} by user {current_user.id}")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="KOT not found or unauthorized")
+
+    ticket = KOTTicket(
+        kot_id=row.id,
+        token_number=row.token_number,
+        order_type=row.order_type.value,
+        table_name=row.table_name,
+        item_name=row.item_name,
+        quantity=row.quantity,
+        notes=row.notes,
+        created_at=row.created_at
+    )
+    return Response(
+        content=render_kot_escpos(ticket),
+        media_type=ESCPOS_MEDIA_TYPE,
+        headers={'Content-Disposition': f'attachment; filename="kot_{kot_id}.bin"'}
+    )
+
 @router.get("/{order_id}/kots", response_model=List[KOTResponse])
 async def list_kots_by_order(
     order_id: int,
@@ -542,7 +734,7 @@ async def list_kots_by_order(
     order = db.query(Order).filter(
         and_(
             Order.id == order_id,
-            Order.outlet_id.in_(get_authorized_outlet_ids(current_user, db))
+            get_outlet_scope(current_user, db).predicate(Order.outlet_id)
         )
     ).first()
     if not order:
@@ -553,21 +745,58 @@ async def list_kots_by_order(
     logger.info(f"Retrieved {len(kots)} KOTs for order {order_id} by user {current_user.id}")
     return kots
 
-@router.get("/outlet/{outlet_id}/kots", response_model=List[KOTResponse])
+# KOT states shown on the kitchen display
+ACTIVE_KOT_STATUSES = [KOTStatus.PENDING.value, KOTStatus.PREPARING.value, KOTStatus.READY.value]
+
+@router.get("/outlet/{outlet_id}/kots", response_model=KitchenQueueResponse)
 async def list_kots_by_outlet(
     outlet_id: int,
     kotstatus: Optional[KOTStatus] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_kot_authorized_user)
 ):
-    if outlet_id not in get_authorized_outlet_ids(current_user, db):
+    if not get_outlet_scope(current_user, db).allows(outlet_id):
         logger.warning(f"User {current_user.id} attempted to list KOTs for unauthorized outlet {outlet_id}")
         raise HTTPException(status_code= status.HTTP_403_FORBIDDEN, detail="No permission for this outlet")
 
-    query = db.query(KOT).join(OrderItem).join(Order).filter(Order.outlet_id == outlet_id)
+    # Oldest first, served from the (outlet_id, status, created_at) index
+    query = db.query(
+        KOT.id,
+        OrderItem.order_id,
+        KOT.order_item_id,
+        Order.token_number,
+        Order.table_id,
+        KOT.status,
+        MenuItem.name.label("item_name"),
+        OrderItem.quantity,
+        OrderItem.notes,
+        KOT.created_at,
+        KOT.updated_at
+    ).join(OrderItem, KOT.order_item_id == OrderItem.id).join(
+        Order, OrderItem.order_id == Order.id
+    ).join(
+        MenuItem, OrderItem.menu_item_id == MenuItem.id
+    ).filter(KOT.outlet_id == outlet_id)
+
     if kotstatus:
         query = query.filter(KOT.status == kotstatus.value)
-    kots = query.all()
-    
-    logger.info(f"Retrieved {len(kots)} KOTs for outlet {outlet_id} by user {current_user.id}")
-    return kots
\ No newline at end of file
+    else:
+        query = query.filter(KOT.status.in_(ACTIVE_KOT_STATUSES))
+
+    position = decode_cursor(cursor)
+    if position:
+        query = query.filter(tuple_(KOT.created_at, KOT.id) > position)
+
+    rows = query.order_by(KOT.created_at, KOT.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    logger.info(f"Retrieved {len(rows)} KOTs for outlet {outlet_id} by user {current_user.id}")
+    return KitchenQueueResponse(
+        items=[KitchenKOTResponse.model_validate(row) for row in rows],
+        next_cursor=next_cursor
+    )
@@ -39,6 +39,7 @@ async def create_restaurant_outlet(
         country=outlet.country,
         phone=outlet.phone,
         email=outlet.email,
+        gst_number=outlet.gst_number,
         is_active=outlet.is_active
     )
     db.add(db_outlet)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, validator
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 from models.billing import PaymentMethod, PaymentStatus, InvoiceStatus
 from models.order_management import OrderType
 
@@ -45,41 +45,115 @@ class InvoiceResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ReceiptLineResponse(BaseModel):
+    name: str
+    quantity: int
+    price: float
+    amount: float
+
+class ReceiptPaymentResponse(BaseModel):
+    method: str
+    amount: Optional[float] = None
+    status: str
+
+class ReceiptResponse(BaseModel):
+    invoice_id: int
+    invoice_number: str
+    created_at: Optional[datetime] = None
+    title: str
+    header_lines: List[str]
+    footer_lines: List[str]
+    items: List[ReceiptLineResponse]
+    subtotal: float
+    tax: float
+    tax_amount: float
+    discount: float
+    net_total: float
+    payments: List[ReceiptPaymentResponse]
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> "ReceiptResponse":
+        return cls(
+            invoice_id=snapshot.invoice_id,
+            invoice_number=snapshot.invoice_number,
+            created_at=snapshot.created_at,
+            title=snapshot.template.title,
+            header_lines=list(snapshot.template.header_lines),
+            footer_lines=list(snapshot.template.footer_lines),
+            items=[
+                ReceiptLineResponse(name=item.name, quantity=item.quantity, price=item.price, amount=item.quantity * item.price)
+                for item in snapshot.items
+            ],
+            subtotal=snapshot.subtotal,
+            tax=snapshot.tax,
+            tax_amount=snapshot.tax_amount,
+            discount=snapshot.discount,
+            net_total=snapshot.net_total,
+            payments=[
+                ReceiptPaymentResponse(method=payment.method, amount=payment.amount, status=payment.status)
+                for payment in snapshot.payments
+            ]
+        )
+
+class DailySalesTotals(BaseModel):
+    gross_amount: float
+    discount_amount: float
+    tax_amount: float
+    net_amount: float
+    invoice_count: int
+    payment_count: int
+    cash_amount: float
+    card_amount: float
+    upi_amount: float
+
+class DailySalesResponse(DailySalesTotals):
+    business_date: date
+
+    class Config:
+        from_attributes = True
+
+class DailySalesReport(BaseModel):
+    outlet_id: int
+    start_date: date
+    end_date: date
+    days: List[DailySalesResponse]
+    totals: DailySalesTotals
+
 class SplitItemRequest(BaseModel):
-    item_ids: List[int] = Field(..., min_items=1, description="List of order item IDs for this split")
+    item_ids: List[int] = Field(default_factory=list, description="List of order item IDs for item-based splits")
     amount: Optional[float] = Field(None, gt=0, description="Split amount for amount-based splits")
 
-    @validator('item_ids')
-    def validate_item_ids(cls, v, values, **kwargs):
-        if values.get('amount') is None and not v:
-            raise ValueError("Item IDs are required for item-based splits")
-        return v
-
-    @validator('amount')
-    def validate_amount(cls, v, values, **kwargs):
-        if values.get('split_by') == 'amount' and v is None:
-            raise ValueError("Amount is required for amount-based splits")
-        return v
+SPLIT_TYPES = ['items', 'amount', 'equal', 'seat']
 
 class SplitBillRequest(BaseModel):
     order_id: int = Field(..., gt=0, description="ID of the order to split")
-    split_by: str = Field(..., description="Split type: 'items' or 'amount'")
+    split_by: str = Field(..., description="Split type: 'items', 'amount', 'equal' or 'seat'")
     discount: Optional[float] = Field(0.0, ge=0, description="Total discount to distribute across splits")
     tax: Optional[float] = Field(0.0, ge=0, description="Total tax to distribute across splits")
-    splits: List[SplitItemRequest] = Field(..., min_items=1, description="List of splits")
+    parts: Optional[int] = Field(None, ge=2, description="Number of equal shares for equal splits")
+    splits: List[SplitItemRequest] = Field(default_factory=list, description="List of splits for item or amount splits")
 
     @validator('split_by')
     def validate_split_by(cls, v):
-        if v not in ['items', 'amount']:
-            raise ValueError("Split type must be 'items' or 'amount'")
+        if v not in SPLIT_TYPES:
+            raise ValueError("Split type must be 'items', 'amount', 'equal' or 'seat'")
         return v
 
-    @validator('splits')
+    @validator('splits', always=True)
     def validate_splits(cls, v, values):
-        if values.get('split_by') == 'items' and any(split.amount for split in v):
+        split_by = values.get('split_by')
+        if split_by in ['items', 'amount'] and not v:
+            raise ValueError(f"At least one split is required for {split_by} splits")
+        if split_by == 'items' and any(split.amount for split in v):
             raise ValueError("Amount should not be provided for item-based splits")
-        if values.get('split_by') == 'amount' and any(split.item_ids for split in v):
+        if split_by == 'items' and any(not split.item_ids for split in v):
+            raise ValueError("Item IDs are required for item-based splits")
+        if split_by == 'amount' and any(split.item_ids for split in v):
             raise ValueError("Item IDs should not be provided for amount-based splits")
+        if split_by == 'amount' and any(split.amount is None for split in v):
+            raise ValueError("Amount is required for amount-based splits")
+        if split_by == 'equal' and values.get('parts') is None:
+            raise ValueError("Parts is required for equal splits")
         return v
 
 class SplitBillResponse(BaseModel):
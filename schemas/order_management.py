@@ -40,6 +40,9 @@ class OrderItemResponse(BaseModel):
     quantity: int
     price: float
     notes: Optional[str] = None
+    seat_number: Optional[int] = None
+    menu_item_name: Optional[str] = None
+    kot_status: Optional[KOTStatus] = None
 
     class Config:
         from_attributes = True
@@ -58,6 +61,7 @@ class OrderItemCreate(BaseModel):
     menu_item_id: int = Field(..., gt=0)
     quantity: int = Field(..., ge=1)
     notes: Optional[str] = None
+    seat_number: Optional[int] = Field(None, ge=1, description="Seat the item is for, used by per-seat bill splits")
 
     @validator('quantity')
     def validate_quantity(cls, v):
@@ -125,16 +129,50 @@ class OrderResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class OrderListResponse(BaseModel):
+    items: List[OrderResponse]
+    next_cursor: Optional[str] = None
+
 class OrderStatusUpdate(BaseModel):
     status: OrderStatus
 
 class KOTResponse(BaseModel):
     id: int
     order_item_id: int
+    outlet_id: Optional[int] = None
+    status: str
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class KitchenKOTResponse(BaseModel):
+    id: int
+    order_id: int
+    order_item_id: int
+    token_number: str
+    table_id: Optional[int] = None
     status: str
+    item_name: str
+    quantity: int
+    notes: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class KitchenQueueResponse(BaseModel):
+    items: List[KitchenKOTResponse]
+    next_cursor: Optional[str] = None
+
 class KOTStatusUpdate(BaseModel):
-    status: KOTStatus
\ No newline at end of file
+    status: KOTStatus
+
+class KOTBulkStatusItem(BaseModel):
+    kot_id: int = Field(..., gt=0)
+    status: KOTStatus
+
+class KOTBulkStatusUpdate(BaseModel):
+    updates: List[KOTBulkStatusItem] = Field(..., min_items=1, description="KOT transitions to apply together")
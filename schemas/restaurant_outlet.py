@@ -11,6 +11,7 @@ class RestaurantOutletBase(BaseModel):
     country: str
     phone: Optional[str] = None
     email: Optional[str] = None
+    gst_number: Optional[str] = None
     is_active: Optional[bool] = True
 
 class RestaurantOutletCreate(RestaurantOutletBase):
@@ -27,6 +28,7 @@ class RestaurantOutletUpdate(BaseModel):
     longitude: Optional[float] = None
     phone: Optional[str] = None
     email: Optional[str] = None
+    gst_number: Optional[str] = None
     status: Optional[str] = None
 
 class RestaurantOutletInDB(RestaurantOutletBase):
@@ -0,0 +1,169 @@
+"""
+Tests run against a scratch Postgres database named by TEST_DATABASE_URL, e.g.
+
+    TEST_DATABASE_URL=postgresql://postgres@localhost:5432/rmspos_test
+
+The database is dropped and recreated for the session and every table is
+truncated before each test, so it must not hold anything you want to keep.
+Without TEST_DATABASE_URL the database-backed tests are skipped; the app's
+.env settings are never used. Hosts other than localhost or a Unix socket
+are refused unless TEST_DATABASE_ALLOW_REMOTE=1.
+"""
+from contextlib import contextmanager
+from typing import List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+import os
+import sys
+import psycopg2
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+TEST_DATABASE_ALLOW_REMOTE = os.getenv("TEST_DATABASE_ALLOW_REMOTE", "").lower() in ("1", "true", "yes")
+LOCAL_HOSTS = ("", "localhost", "127.0.0.1", "::1")
+
+test_url = make_url(TEST_DATABASE_URL) if TEST_DATABASE_URL else None
+# A socket directory may be given as ?host=/path, as libpq allows
+test_host = (test_url.host or test_url.query.get("host") or "") if test_url else ""
+
+if test_url is not None:
+    # utils.database builds its URL from these and loads .env without overriding
+    # what is already set, so every one is set here, even when empty
+    os.environ.update(
+        DB_USER=test_url.username or "",
+        DB_PASSWORD=test_url.password or "",
+        DB_HOST=test_url.host or "",
+        DB_PORT=str(test_url.port or 5432),
+        DB_NAME=test_url.database or ""
+    )
+    if test_host.startswith("/"):
+        os.environ["PGHOST"] = test_host
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+
+def _admin_connection():
+    connection = psycopg2.connect(
+        host=test_host or None,
+        port=test_url.port or 5432,
+        user=test_url.username,
+        password=test_url.password,
+        dbname="postgres",
+        connect_timeout=3
+    )
+    connection.autocommit = True
+    return connection
+
+
+def _recreate_database(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP DATABASE IF EXISTS "{test_url.database}" WITH (FORCE)')
+        cursor.execute(f'CREATE DATABASE "{test_url.database}"')
+
+
+@pytest.fixture(scope="session")
+def app():
+    if test_url is None:
+        pytest.skip("Set TEST_DATABASE_URL to run database tests")
+    if not test_url.database or test_url.database == "postgres":
+        pytest.skip("TEST_DATABASE_URL must name a scratch database, not postgres")
+    if not (test_host in LOCAL_HOSTS or test_host.startswith("/")) and not TEST_DATABASE_ALLOW_REMOTE:
+        pytest.skip(f"Refusing to drop a database on {test_host}; set TEST_DATABASE_ALLOW_REMOTE=1 to allow it")
+
+    from utils.database import engine
+    if (engine.url.host or "", engine.url.database) != (test_url.host or "", test_url.database):
+        pytest.exit(f"App engine points at {engine.url.host}/{engine.url.database}, not the test database", returncode=2)
+
+    try:
+        connection = _admin_connection()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Postgres is not reachable: {str(e).strip()}")
+    _recreate_database(connection)
+
+    # Importing the app creates the tables in the test database
+    from app.main import app
+    yield app
+
+    engine.dispose()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP DATABASE IF EXISTS "{test_url.database}" WITH (FORCE)')
+    connection.close()
+
+
+@pytest.fixture
+def client(app):
+    from fastapi.testclient import TestClient
+    from utils.database import Base, engine
+    from utils.outlet_scope import outlet_index, scope_cache
+
+    # Every test starts from empty tables and caches
+    tables = ", ".join(f'"{name}"' for name in Base.metadata.tables)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(f"TRUNCATE {tables} RESTART IDENTITY CASCADE")
+    scope_cache.invalidate()
+    outlet_index.invalidate()
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def db(client):
+    from utils.database import SessionLocal
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def outlet(db):
+    """An owner's outlet with a manager and a small chain menu."""
+    from models.menu_management import MenuCategory, MenuItem, MenuScope
+    from models.restaurant_chain import RestaurantChain
+    from models.restaurant_outlet import RestaurantOutlet
+    from models.user import User, UserRole
+
+    owner = User(email="owner@example.com", username="owner", hashed_password="x", role=UserRole.OWNER)
+    db.add(owner)
+    db.flush()
+    chain = RestaurantChain(name="Chain", owner_id=owner.id)
+    db.add(chain)
+    db.flush()
+    outlet = RestaurantOutlet(
+        chain_id=chain.id, name="Main", address="1 Main St", city="Pune",
+        state="MH", postal_code="411001", country="IN"
+    )
+    db.add(outlet)
+    db.flush()
+    category = MenuCategory(name="Food", scope=MenuScope.CHAIN, chain_id=chain.id)
+    db.add(category)
+    db.flush()
+    db.add_all([MenuItem(name=f"Dish {i}", price=100.0 + i, category_id=category.id) for i in range(5)])
+    db.add(User(email="manager@example.com", username="manager", hashed_password="x", role=UserRole.MANAGER, outlet_id=outlet.id))
+    db.commit()
+    return outlet
+
+
+def auth_headers(username: str) -> dict:
+    from utils.auth import create_access_token
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+
+@contextmanager
+def count_queries(bind: Optional[Engine] = None):
+    """Collect every statement the engine (by default the app's) sends while the block runs."""
+    from utils.database import engine
+    bind = bind or engine
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", before_cursor_execute)
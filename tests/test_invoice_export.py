@@ -0,0 +1,67 @@
+from datetime import datetime
+from io import BytesIO
+from itertools import count as counter
+from conftest import auth_headers
+from models.billing import Invoice
+from models.order_management import Order, OrderStatus, OrderType
+from utils.timezones import IST
+import zipfile
+
+_numbers = counter(1)
+
+
+def add_invoice(db, outlet, created_at: datetime) -> Invoice:
+    number = next(_numbers)
+    order = Order(
+        token_number=f"EXP-{number}", outlet_id=outlet.id,
+        order_type=OrderType.TAKEAWAY, status=OrderStatus.COMPLETED, total_amount=100.0
+    )
+    db.add(order)
+    db.flush()
+    invoice = Invoice(
+        invoice_number=f"INV-{number}", order_id=order.id,
+        subtotal=100.0, total_amount=100.0, created_at=created_at
+    )
+    db.add(invoice)
+    db.commit()
+    return invoice
+
+
+def export(client, outlet_id: int, day: str, export_format: str = "zip"):
+    return client.get(
+        "/api/v1/billing/invoices/export",
+        params={"outlet_id": outlet_id, "start_date": day, "end_date": day, "format": export_format},
+        headers=auth_headers("manager")
+    )
+
+
+def test_zip_export_holds_one_receipt_per_invoice_of_the_ist_day(client, db, outlet):
+    morning = add_invoice(db, outlet, datetime(2026, 3, 1, 4, 0))
+    evening = add_invoice(db, outlet, datetime(2026, 3, 1, 10, 0))
+    # 20:00 UTC on the 1st is already the 2nd in IST
+    late = add_invoice(db, outlet, datetime(2026, 3, 1, 20, 0))
+
+    response = export(client, outlet.id, "2026-03-01")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(BytesIO(response.content)) as archive:
+        names = [f"invoice_{invoice.invoice_number}.pdf" for invoice in (morning, evening)]
+        assert archive.namelist() == names
+        assert archive.read(names[0]).startswith(b"%PDF")
+        issued_at = datetime(2026, 3, 1, 4, 0) + IST.utcoffset(None)
+        assert archive.getinfo(names[0]).date_time == issued_at.timetuple()[:6]
+
+    response = export(client, outlet.id, "2026-03-02")
+    with zipfile.ZipFile(BytesIO(response.content)) as archive:
+        assert archive.namelist() == [f"invoice_{late.invoice_number}.pdf"]
+
+
+def test_pdf_export_and_empty_range(client, db, outlet):
+    add_invoice(db, outlet, datetime(2026, 3, 1, 4, 0))
+
+    response = export(client, outlet.id, "2026-03-01", "pdf")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.content.startswith(b"%PDF")
+
+    assert export(client, outlet.id, "2026-03-05").status_code == 404
@@ -0,0 +1,89 @@
+from itertools import count as counter
+from conftest import auth_headers, count_queries
+from models.billing import Invoice, Payment, PaymentMethod
+from models.menu_management import MenuItem
+from models.order_management import KOT, Order, OrderItem, OrderStatus, OrderType
+
+_tokens = counter(1)
+
+
+def add_orders(db, outlet, count: int, lines: int = 3):
+    menu_items = db.query(MenuItem).all()
+    orders = []
+    for _ in range(count):
+        order = Order(
+            token_number=f"T{next(_tokens)}",
+            outlet_id=outlet.id,
+            order_type=OrderType.TAKEAWAY,
+            status=OrderStatus.READY,
+            total_amount=0.0
+        )
+        db.add(order)
+        db.flush()
+        for menu_item in menu_items[:lines]:
+            item = OrderItem(order_id=order.id, menu_item_id=menu_item.id, quantity=1, price=menu_item.price)
+            db.add(item)
+            db.flush()
+            db.add(KOT(order_item_id=item.id, outlet_id=outlet.id))
+        orders.append(order)
+    db.commit()
+    return orders
+
+
+def add_invoices(db, order, count: int):
+    for n in range(count):
+        invoice = Invoice(
+            invoice_number=f"INV-{order.id}-{n}", order_id=order.id,
+            subtotal=100.0, tax=5.0, total_amount=105.0
+        )
+        invoice.payments = [
+            Payment(amount=50.0, method=PaymentMethod.CASH),
+            Payment(amount=55.0, method=PaymentMethod.UPI)
+        ]
+        db.add(invoice)
+    db.commit()
+
+
+def test_list_orders_query_count_is_independent_of_row_count(client, db, outlet):
+    add_orders(db, outlet, 1)
+    with count_queries() as few:
+        response = client.get("/api/v1/orders", headers=auth_headers("manager"))
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 1
+
+    add_orders(db, outlet, 9, lines=5)
+    with count_queries() as many:
+        response = client.get("/api/v1/orders", headers=auth_headers("manager"))
+    assert response.status_code == 200
+    orders = response.json()["items"]
+    assert len(orders) == 10
+    assert all(item["menu_item_name"] for order in orders for item in order["items"])
+
+    assert len(many) == len(few)
+
+
+def test_get_order_query_count_is_independent_of_line_count(client, db, outlet):
+    small, large = add_orders(db, outlet, 1, lines=1) + add_orders(db, outlet, 1, lines=5)
+
+    with count_queries() as few:
+        assert client.get(f"/api/v1/orders/{small.id}", headers=auth_headers("manager")).status_code == 200
+    with count_queries() as many:
+        response = client.get(f"/api/v1/orders/{large.id}", headers=auth_headers("manager"))
+    assert len(response.json()["items"]) == 5
+
+    assert len(many) == len(few)
+
+
+def test_list_invoices_query_count_is_independent_of_row_count(client, db, outlet):
+    first, second = add_orders(db, outlet, 2)
+    add_invoices(db, first, 1)
+    add_invoices(db, second, 6)
+
+    with count_queries() as few:
+        assert len(client.get(f"/api/v1/billing/invoices/order/{first.id}", headers=auth_headers("manager")).json()) == 1
+    with count_queries() as many:
+        invoices = client.get(f"/api/v1/billing/invoices/order/{second.id}", headers=auth_headers("manager")).json()
+    assert len(invoices) == 6
+    assert all(len(invoice["payments"]) == 2 for invoice in invoices)
+
+    assert len(many) == len(few)
@@ -0,0 +1,56 @@
+from contextlib import ExitStack
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from conftest import auth_headers, count_queries
+from utils.database import engine
+from utils.websocket_broker import broker
+import asyncio
+import pytest
+import utils.outlet_scope as outlet_scope
+
+SOCKETS = 500
+
+
+@pytest.fixture
+def small_pool(client, monkeypatch):
+    """Outlet lookups go through a two-connection pool that fails fast when exhausted."""
+    small_engine = create_engine(engine.url, pool_size=2, max_overflow=0, pool_timeout=1)
+    monkeypatch.setattr(outlet_scope, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=small_engine))
+    yield small_engine
+    small_engine.dispose()
+
+
+def test_concurrent_lookups_share_one_refresh(small_pool, outlet):
+    index = outlet_scope.OutletIndex(ttl=60)
+
+    async def lookups():
+        return await asyncio.gather(*[index.contains(outlet_id) for _ in range(SOCKETS)])
+
+    outlet_id = outlet.id
+    with count_queries(small_pool) as statements:
+        assert all(asyncio.run(lookups()))
+    assert len(statements) == 1
+    assert small_pool.pool.checkedout() == 0
+    assert outlet_id in index._outlet_ids
+
+
+def test_websockets_hold_no_connection_while_open(client, db, small_pool, outlet, monkeypatch):
+    monkeypatch.setattr(broker, "max_connections_per_outlet", 0)
+    outlet_id = outlet.id
+    db.close()
+    outlet_scope.outlet_index.invalidate()
+
+    with ExitStack() as stack, count_queries() as statements:
+        sockets = [
+            stack.enter_context(client.websocket_connect(f"/api/v1/notifications/ws/{outlet_id}"))
+            for _ in range(SOCKETS)
+        ]
+        assert broker.metrics()["connections"] == SOCKETS
+        assert small_pool.pool.checkedout() == 0
+        assert engine.pool.checkedout() == 0
+        assert statements == []
+
+        # HTTP requests still get connections while every socket is open
+        assert client.get("/api/v1/orders", headers=auth_headers("manager")).status_code == 200
+        client.post("/api/v1/notifications/test-broadcast", json={"outlet_id": outlet_id, "type": "hello"})
+        assert all(socket.receive_json()["type"] == "hello" for socket in sockets)
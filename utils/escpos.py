@@ -0,0 +1,184 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
+from utils.invoice_snapshot import InvoiceSnapshot
+from utils.timezones import IST
+import os
+import textwrap
+
+# Characters per line in font A: 48 on 80mm paper, 32 on 58mm paper
+ESCPOS_LINE_WIDTH = int(os.getenv("ESCPOS_LINE_WIDTH", 48))
+
+ESCPOS_MEDIA_TYPE = "application/vnd.escpos"
+
+ESC = b"\x1b"
+GS = b"\x1d"
+INITIALIZE = ESC + b"@"
+CODE_PAGE_PC437 = ESC + b"t\x00"
+ALIGN_LEFT = ESC + b"a\x00"
+ALIGN_CENTER = ESC + b"a\x01"
+BOLD_ON = ESC + b"E\x01"
+BOLD_OFF = ESC + b"E\x00"
+SIZE_NORMAL = GS + b"!\x00"
+SIZE_DOUBLE = GS + b"!\x11"
+FEED_AND_CUT = GS + b"V\x42\x03"  # Feed three lines, then partial cut
+
+
+def _printable(text: str) -> str:
+    # The rupee sign is not in any standard printer code page
+    return text.replace("₹", "Rs.")
+
+
+def _local_time(value: Optional[datetime]) -> datetime:
+    return (value or datetime.utcnow()).replace(tzinfo=timezone.utc).astimezone(IST)
+
+
+class EscPosBuilder:
+    """Accumulates ESC/POS commands and text for one printed ticket."""
+
+    def __init__(self, width: int = ESCPOS_LINE_WIDTH):
+        self.width = width
+        self._parts: List[bytes] = [INITIALIZE, CODE_PAGE_PC437]
+
+    def raw(self, command: bytes) -> "EscPosBuilder":
+        self._parts.append(command)
+        return self
+
+    def line(self, text: str = "") -> "EscPosBuilder":
+        self._parts.append(_printable(text).encode("cp437", errors="replace") + b"\n")
+        return self
+
+    def centered(self, text: str, bold: bool = False, double: bool = False) -> "EscPosBuilder":
+        self._parts.append(ALIGN_CENTER)
+        if bold:
+            self._parts.append(BOLD_ON)
+        if double:
+            self._parts.append(SIZE_DOUBLE)
+        self.line(text)
+        if double:
+            self._parts.append(SIZE_NORMAL)
+        if bold:
+            self._parts.append(BOLD_OFF)
+        self._parts.append(ALIGN_LEFT)
+        return self
+
+    def columns(self, left: str, right: str, bold: bool = False) -> "EscPosBuilder":
+        """Left text and right-aligned text on one line, truncating the left side to fit."""
+        left, right = _printable(left), _printable(right)
+        room = max(self.width - len(right) - 1, 0)
+        if len(left) > room:
+            left = left[:max(room - 3, 0)] + "..."
+        if bold:
+            self._parts.append(BOLD_ON)
+        self.line(left.ljust(self.width - len(right)) + right)
+        if bold:
+            self._parts.append(BOLD_OFF)
+        return self
+
+    def rule(self, char: str = "-") -> "EscPosBuilder":
+        return self.line(char * self.width)
+
+    def wrapped(self, text: str, indent: str = "") -> "EscPosBuilder":
+        for part in textwrap.wrap(text, self.width - len(indent)) or [""]:
+            self.line(indent + part)
+        return self
+
+    def build(self) -> bytes:
+        return b"".join(self._parts) + FEED_AND_CUT
+
+
+def render_receipt_escpos(invoice: InvoiceSnapshot, width: int = ESCPOS_LINE_WIDTH) -> bytes:
+    """ESC/POS counterpart of render_receipt_pdf, printed as-is by thermal printers."""
+    issued_at = _local_time(invoice.created_at)
+    ticket = EscPosBuilder(width)
+
+    # Business Header
+    ticket.centered(invoice.template.title, bold=True, double=True)
+    for line in invoice.template.header_lines:
+        ticket.centered(line)
+    ticket.line()
+
+    # Invoice Details
+    ticket.columns(f"Bill No: {invoice.invoice_number}", f"Date: {issued_at:%d-%m-%Y}", bold=True)
+    ticket.line(f"Time: {issued_at:%I:%M %p} IST")
+    ticket.rule()
+
+    # Items List, quantity in a fixed column ahead of the amount
+    ticket.columns("DESCRIPTION", "QTY      AMOUNT", bold=True)
+    ticket.rule()
+    for item in invoice.items:
+        amount = f"₹{item.quantity * item.price:.2f}"
+        ticket.columns(item.name, f"{item.quantity:>3} {amount:>11}")
+    ticket.rule()
+
+    # Totals and Taxes
+    ticket.columns("Subtotal:", f"₹{invoice.subtotal:.2f}")
+    if invoice.tax:
+        ticket.columns(f"Tax ({invoice.tax:.1f}%):", f"₹{invoice.tax_amount:.2f}")
+    if invoice.discount and invoice.discount > 0:
+        ticket.columns("Discount:", f"-₹{invoice.discount:.2f}")
+    ticket.columns("NET TOTAL:", f"₹{invoice.net_total:.2f}", bold=True)
+    ticket.line()
+
+    # Payment Info
+    for payment in invoice.payments:
+        amount = f"₹{payment.amount:.2f}" if payment.amount is not None else "₹0.00"
+        ticket.columns(f"Paid by {payment.method} ({payment.status})", amount)
+
+    # Footer
+    ticket.rule()
+    for line in invoice.template.footer_lines:
+        ticket.centered(line)
+    return ticket.build()
+
+
+@dataclass(frozen=True)
+class KOTTicket:
+    kot_id: int
+    token_number: str
+    order_type: str
+    table_name: Optional[str]
+    item_name: str
+    quantity: int
+    notes: Optional[str]
+    created_at: Optional[datetime]
+
+
+def render_kot_escpos(kot: KOTTicket, width: int = ESCPOS_LINE_WIDTH) -> bytes:
+    """Kitchen order ticket: large token and item lines readable across the pass."""
+    ticket = EscPosBuilder(width)
+    ticket.centered("KOT", bold=True)
+    ticket.centered(kot.token_number, bold=True, double=True)
+    ticket.columns(f"KOT #{kot.kot_id}", f"{_local_time(kot.created_at):%d-%m %I:%M %p}")
+    ticket.line(f"Table: {kot.table_name}" if kot.table_name else f"Type: {kot.order_type}")
+    ticket.rule("=")
+    ticket.raw(BOLD_ON + SIZE_DOUBLE)
+    # Double-size characters take two columns each
+    for part in textwrap.wrap(f"{kot.quantity} x {kot.item_name}", width // 2) or [""]:
+        ticket.line(part)
+    ticket.raw(SIZE_NORMAL + BOLD_OFF)
+    if kot.notes:
+        ticket.wrapped(kot.notes, indent="  Note: ")
+    ticket.rule("=")
+    return ticket.build()
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m utils.escpos
+    import timeit
+    from utils.invoice_snapshot import ReceiptLine, ReceiptPayment
+    from utils.pdf_generator import render_receipt_pdf
+
+    snapshot = InvoiceSnapshot(
+        invoice_id=1,
+        invoice_number="O1-INV-2627-0001",
+        created_at=datetime.utcnow(),
+        tax=5.0,
+        discount=20.0,
+        items=tuple(ReceiptLine(name=f"Menu item number {n}", quantity=n % 3 + 1, price=99.5 + n) for n in range(20)),
+        payments=(ReceiptPayment(method="upi", amount=2500.0, status="completed"),)
+    )
+    runs = 200
+    for name, render in [("escpos", render_receipt_escpos), ("pdf", render_receipt_pdf)]:
+        seconds = min(timeit.repeat(lambda: render(snapshot), number=runs, repeat=3)) / runs
+        print(f"{name:>6}: {seconds * 1000:8.3f} ms per receipt, {len(render(snapshot)):6d} bytes")
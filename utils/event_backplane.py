@@ -0,0 +1,211 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from datetime import datetime
+from select import select as wait_readable
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Engine
+from utils.database import engine
+from utils.event_log import RESYNC_REQUIRED, event_log, prune_outlet_events
+from utils.websocket_broker import broker
+from models.event_log import OutletEvent, OutletEventCounter
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# "memory" delivers within this process only; "postgres" fans out to every worker via LISTEN/NOTIFY
+EVENT_BACKPLANE = os.getenv("EVENT_BACKPLANE", "memory")
+EVENT_BACKPLANE_CHANNEL = os.getenv("EVENT_BACKPLANE_CHANNEL", "rms_events")
+# Seconds to wait before reconnecting a dropped LISTEN connection
+EVENT_BACKPLANE_RECONNECT_DELAY = float(os.getenv("EVENT_BACKPLANE_RECONNECT_DELAY", 2))
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_BYTES = 7999
+LISTEN_POLL_INTERVAL = 1.0
+# Persisted events written between prunes of expired outlet_events rows
+PRUNE_EVERY = 1000
+
+
+class EventBackplane(ABC):
+    """
+    Carries WebSocket events between worker processes. publish() numbers an
+    event in the event log and hands it to every worker's broker, including
+    this one; start() and stop() run with the app.
+    """
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    def publish(self, topic: str, outlet_id: int, message: dict):
+        pass
+
+
+class InMemoryBackplane(EventBackplane):
+    """Single-process backplane, for one worker and for tests."""
+
+    def publish(self, topic: str, outlet_id: int, message: dict):
+        broker.publish(topic, outlet_id, event_log.record(outlet_id, topic, message))
+
+
+class PostgresBackplane(EventBackplane):
+    """
+    Backplane over Postgres LISTEN/NOTIFY. Each event takes the outlet's next
+    seq from outlet_event_counters and is sent on the channel in the same
+    transaction; the counter row lock makes commit order, and so NOTIFY
+    order, match seq order. A listener thread per worker, this one
+    included, records what arrives in the event log and hands it to the
+    broker. Events published while a worker's listener is reconnecting do
+    not reach that worker's sockets; clients catch up with ?since=.
+    """
+
+    def __init__(self, engine: Engine, channel: str):
+        if not re.fullmatch(r"[a-z_][a-z0-9_]*", channel):
+            raise ValueError(f"Invalid event backplane channel: {channel}")
+        self.engine = engine
+        self.channel = channel
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._notifier: Optional[ThreadPoolExecutor] = None
+        self._listener: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._persisted_since_prune = 0
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping.clear()
+        event_log.database_backed = True
+        # One thread keeps NOTIFYs in publish order and off the event loop
+        self._notifier = ThreadPoolExecutor(max_workers=1, thread_name_prefix="event-backplane-notify")
+        self._listener = threading.Thread(target=self._listen, name="event-backplane-listen", daemon=True)
+        self._listener.start()
+        logger.info(f"Event backplane listening on Postgres channel {self.channel}")
+
+    async def stop(self):
+        self._stopping.set()
+        if self._notifier is not None:
+            self._notifier.shutdown(wait=True)
+            self._notifier = None
+        if self._listener is not None:
+            await asyncio.to_thread(self._listener.join, LISTEN_POLL_INTERVAL * 5)
+            self._listener = None
+
+    def publish(self, topic: str, outlet_id: int, message: dict):
+        if self._notifier is None:
+            # Not started (scripts, one-off tasks): notify inline
+            self._notify(topic, outlet_id, message)
+        else:
+            self._notifier.submit(self._notify, topic, outlet_id, message)
+
+    def _notify(self, topic: str, outlet_id: int, message: dict):
+        try:
+            with self.engine.begin() as connection:
+                counter = insert(OutletEventCounter).values(outlet_id=outlet_id, last_seq=1, updated_at=datetime.utcnow())
+                seq = connection.execute(counter.on_conflict_do_update(
+                    index_elements=[OutletEventCounter.outlet_id],
+                    set_={"last_seq": OutletEventCounter.last_seq + 1, "updated_at": counter.excluded.updated_at}
+                ).returning(OutletEventCounter.last_seq)).scalar_one()
+
+                stamped = {**message, "seq": seq}
+                if event_log.persist:
+                    connection.execute(insert(OutletEvent).values(
+                        outlet_id=outlet_id, seq=seq, topic=topic, payload=json.dumps(stamped), created_at=datetime.utcnow()
+                    ))
+
+                payload = json.dumps({"topic": topic, "outlet_id": outlet_id, "seq": seq, "message": stamped})
+                if len(payload.encode()) > MAX_NOTIFY_BYTES:
+                    # Listeners load stored events; otherwise clients are told to resync
+                    logger.warning(f"Event {message.get('type')} for outlet {outlet_id} is too large for NOTIFY")
+                    payload = json.dumps({"topic": topic, "outlet_id": outlet_id, "seq": seq, "stored": event_log.persist})
+                connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+        except Exception as e:
+            logger.warning(f"Failed to publish event on channel {self.channel}: {str(e)}")
+            return
+
+        if event_log.persist:
+            self._persisted_since_prune += 1
+            if self._persisted_since_prune >= PRUNE_EVERY:
+                self._persisted_since_prune = 0
+                self._prune()
+
+    def _prune(self):
+        # Own transaction: the DELETE must not run while holding an outlet counter row lock
+        try:
+            with self.engine.begin() as connection:
+                removed = prune_outlet_events(connection)
+            logger.info(f"Pruned {removed} expired outlet events")
+        except Exception as e:
+            logger.warning(f"Failed to prune outlet events: {str(e)}")
+
+    def _listen(self):
+        while not self._stopping.is_set():
+            connection = None
+            try:
+                # A dedicated connection, detached so the pool never recycles it
+                pooled = self.engine.raw_connection()
+                pooled.detach()
+                connection = pooled.dbapi_connection
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+
+                while not self._stopping.is_set():
+                    if wait_readable([connection], [], [], LISTEN_POLL_INTERVAL) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        self._receive(connection.notifies.pop(0).payload)
+            except Exception as e:
+                logger.warning(f"Event backplane listener failed, reconnecting: {str(e)}")
+                self._stopping.wait(EVENT_BACKPLANE_RECONNECT_DELAY)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+    def _receive(self, payload: str):
+        try:
+            event = json.loads(payload)
+            topic, outlet_id, seq = event["topic"], event["outlet_id"], event["seq"]
+        except (ValueError, KeyError):
+            logger.warning(f"Ignoring malformed event on channel {self.channel}")
+            return
+        message = event.get("message")
+        if message is None:
+            message = self._load_stored(outlet_id, seq) if event.get("stored") else None
+            if message is None:
+                message = {"type": RESYNC_REQUIRED, "outlet_id": outlet_id, "seq": seq}
+        self._loop.call_soon_threadsafe(self._deliver, topic, outlet_id, seq, message)
+
+    def _load_stored(self, outlet_id: int, seq: int) -> Optional[dict]:
+        with self.engine.connect() as connection:
+            payload = connection.scalar(
+                select(OutletEvent.payload).where(OutletEvent.outlet_id == outlet_id, OutletEvent.seq == seq)
+            )
+        return json.loads(payload) if payload else None
+
+    def _deliver(self, topic: str, outlet_id: int, seq: int, message: dict):
+        stamped = event_log.record(outlet_id, topic, message, seq)
+        if stamped is not None:
+            broker.publish(topic, outlet_id, stamped)
+
+
+def create_backplane(kind: str) -> EventBackplane:
+    if kind == "memory":
+        return InMemoryBackplane()
+    if kind == "postgres":
+        return PostgresBackplane(engine, EVENT_BACKPLANE_CHANNEL)
+    raise ValueError(f"Unknown EVENT_BACKPLANE: {kind}")
+
+
+backplane = create_backplane(EVENT_BACKPLANE)
@@ -0,0 +1,133 @@
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional
+from sqlalchemy import delete, select
+from sqlalchemy.engine import Connection
+from starlette.concurrency import run_in_threadpool
+from utils.database import SessionLocal
+from models.event_log import OutletEvent, OutletEventCounter
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Recent events kept in memory per outlet for ?since= replay
+EVENT_LOG_SIZE = int(os.getenv("EVENT_LOG_SIZE", 1000))
+# Also store events in outlet_events (Postgres backplane only), so replay survives restarts
+EVENT_LOG_PERSIST = os.getenv("EVENT_LOG_PERSIST", "false").lower() in ("1", "true", "yes")
+EVENT_LOG_RETENTION_HOURS = float(os.getenv("EVENT_LOG_RETENTION_HOURS", 24))
+
+RESYNC_REQUIRED = "resync_required"
+
+
+@dataclass(frozen=True)
+class LoggedEvent:
+    seq: int
+    topic: str
+    message: dict  # As sent to clients, including its seq
+
+
+class EventLog:
+    """
+    Stamps every outlet event with a per-outlet, increasing seq and keeps the
+    most recent ones in a ring buffer, so a reconnecting client can ask for
+    just the events after the last seq it saw.
+
+    With the in-memory backplane this process numbers events itself; with the
+    Postgres backplane numbers come from outlet_event_counters and events are
+    recorded here as each worker receives them.
+    """
+
+    def __init__(self, size: int, persist: bool):
+        self.size = size
+        self.persist = persist
+        self.database_backed = False  # Set by the Postgres backplane
+        self._events: Dict[int, Deque[LoggedEvent]] = {}
+        self._last_seq: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        # Local numbering starts from the clock, so a restarted process never
+        # reissues a seq clients saw before the restart
+        self._seq_base = int(time.time() * 1000) * 1000
+
+    def record(self, outlet_id: int, topic: str, message: dict, seq: Optional[int] = None) -> Optional[dict]:
+        """
+        Log an event and return it stamped with its seq. Without seq the next
+        local number is used. Returns None for an event already recorded.
+        """
+        with self._lock:
+            last_seq = self._last_seq.get(outlet_id)
+            if seq is None:
+                seq = (last_seq if last_seq is not None else self._seq_base) + 1
+            elif last_seq is not None and seq <= last_seq:
+                return None
+            stamped = {**message, "seq": seq}
+            events = self._events.get(outlet_id)
+            if events is None:
+                events = self._events[outlet_id] = deque(maxlen=self.size)
+            events.append(LoggedEvent(seq, topic, stamped))
+            self._last_seq[outlet_id] = seq
+            return stamped
+
+    def last_seq(self, outlet_id: int) -> Optional[int]:
+        return self._last_seq.get(outlet_id)
+
+    async def events_since(self, outlet_id: int, since: int) -> Optional[List[LoggedEvent]]:
+        """
+        Every event for the outlet after since, oldest first, or None when
+        they are no longer all available and the client has to resync.
+        """
+        events = self._events_in_memory(outlet_id, since)
+        if events is not None or not self.database_backed:
+            return events
+        return await run_in_threadpool(self._events_in_database, outlet_id, since)
+
+    def resync_message(self, outlet_id: int) -> dict:
+        return {"type": RESYNC_REQUIRED, "outlet_id": outlet_id, "seq": self.last_seq(outlet_id)}
+
+    def _events_in_memory(self, outlet_id: int, since: int) -> Optional[List[LoggedEvent]]:
+        with self._lock:
+            last_seq = self._last_seq.get(outlet_id)
+            if last_seq is None or since > last_seq:
+                return None
+            events = list(self._events[outlet_id])
+        if since == last_seq:
+            return []
+        missed = [event for event in events if event.seq > since]
+        # Seqs are consecutive per outlet, so anything short of since + 1..last_seq means the
+        # buffer does not reach back far enough or has a hole (e.g. a NOTIFY lost while reconnecting)
+        if not missed or missed[0].seq != since + 1 or len(missed) != last_seq - since:
+            return None
+        return missed
+
+    def _events_in_database(self, outlet_id: int, since: int) -> Optional[List[LoggedEvent]]:
+        # After a restart this worker's buffer is empty, but the counter and,
+        # if persisted, the stored events still know what the client missed
+        db = SessionLocal()
+        try:
+            last_seq = db.scalar(select(OutletEventCounter.last_seq).where(OutletEventCounter.outlet_id == outlet_id)) or 0
+            if since == last_seq:
+                return []
+            if since > last_seq or not self.persist:
+                return None
+            rows = db.query(OutletEvent).filter(
+                OutletEvent.outlet_id == outlet_id,
+                OutletEvent.seq > since
+            ).order_by(OutletEvent.seq).limit(self.size + 1).all()
+            if not rows or rows[0].seq != since + 1 or len(rows) > self.size:
+                return None
+            return [LoggedEvent(row.seq, row.topic, json.loads(row.payload)) for row in rows]
+        finally:
+            db.close()
+
+
+def prune_outlet_events(connection: Connection, retention_hours: float = EVENT_LOG_RETENTION_HOURS) -> int:
+    """Delete persisted events older than the retention window; returns rows removed."""
+    cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+    return connection.execute(delete(OutletEvent).where(OutletEvent.created_at < cutoff)).rowcount
+
+
+event_log = EventLog(size=EVENT_LOG_SIZE, persist=EVENT_LOG_PERSIST)
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from utils.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+Publisher = Callable[[dict], Awaitable[Any]]
+
+# Keep references to in-flight publish tasks so they are not garbage collected
+_pending_tasks: Set[asyncio.Task] = set()
+
+
+class EventOutbox:
+    """
+    Collects notifications raised while a request's transaction is open and
+    publishes them only once it commits. Messages enqueued under the same key
+    are coalesced into one, with their items concatenated.
+    """
+
+    def __init__(self):
+        self._messages: Dict[Hashable, dict] = {}
+        self._publishers: Dict[Hashable, Publisher] = {}
+        self._items_keys: Dict[Hashable, Optional[str]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def enqueue(
+        self,
+        publisher: Publisher,
+        message: dict,
+        key: Optional[Hashable] = None,
+        items_key: Optional[str] = None,
+        items: Optional[List[dict]] = None
+    ):
+        if self._loop is None:
+            try:
+                self._loop = asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+
+        key = key if key is not None else (publisher, len(self._messages))
+        if key not in self._messages:
+            self._messages[key] = dict(message)
+            self._publishers[key] = publisher
+            self._items_keys[key] = items_key
+            if items_key:
+                self._messages[key][items_key] = []
+        if items_key and items:
+            self._messages[key][items_key].extend(items)
+
+    def discard(self):
+        self._messages.clear()
+        self._publishers.clear()
+        self._items_keys.clear()
+
+    def dispatch(self):
+        """Schedule every collected message for publishing without awaiting delivery."""
+        batches = [(self._publishers[key], message) for key, message in self._messages.items()]
+        self.discard()
+        for publisher, message in batches:
+            self._schedule(publisher, message)
+
+    def _schedule(self, publisher: Publisher, message: dict):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is not None:
+            task = loop.create_task(_publish(publisher, message))
+            _pending_tasks.add(task)
+            task.add_done_callback(_pending_tasks.discard)
+        elif self._loop is not None and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(_publish(publisher, message), self._loop)
+        else:
+            asyncio.run(_publish(publisher, message))
+
+
+async def _publish(publisher: Publisher, message: dict):
+    try:
+        await publisher(message)
+    except Exception as e:
+        logger.warning(f"Failed to publish outbox event {message.get('type')} for outlet {message.get('outlet_id')}: {str(e)}")
+
+
+def get_outbox(db: Session) -> EventOutbox:
+    """Return the outbox bound to this session, creating it on first use."""
+    outbox = db.info.get("event_outbox")
+    if outbox is None:
+        outbox = db.info["event_outbox"] = EventOutbox()
+    return outbox
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _dispatch_outbox(session: Session):
+    outbox = session.info.pop("event_outbox", None)
+    if outbox is not None:
+        outbox.dispatch()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _discard_outbox(session: Session, *args):
+    outbox = session.info.pop("event_outbox", None)
+    if outbox is not None:
+        outbox.discard()
@@ -0,0 +1,154 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Hashable, List, Optional, Tuple
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from jose import JWTError, jwt
+from utils.auth import ALGORITHM, SECRET_KEY
+import asyncio
+import hashlib
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# How long a stored response answers retries of the same key
+IDEMPOTENCY_KEY_TTL = float(os.getenv("IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", 10000))
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+MAX_KEY_LENGTH = 255
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    expires_at: float
+    done: asyncio.Future
+    status_code: Optional[int] = None
+    body: bytes = b""
+    raw_headers: List[Tuple[bytes, bytes]] = field(default_factory=list)
+
+    def replay(self) -> Response:
+        response = Response(content=self.body, status_code=self.status_code)
+        response.raw_headers = [*self.raw_headers, (b"idempotency-replayed", b"true")]
+        return response
+
+
+class IdempotencyStore:
+    """
+    Remembers the first response for each (principal, Idempotency-Key) for ttl
+    seconds. A retry with the same key and body is answered from memory; a
+    duplicate that arrives while the first is still running waits for it
+    instead of running the handler again. Server errors are not stored, so
+    they can be retried for real.
+
+    Entries live in this process only; deployments running several workers
+    get deduplication per worker.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+
+    async def execute(self, scope_key: Hashable, fingerprint: str, call: Callable[[], Awaitable[Response]]) -> Response:
+        while True:
+            self._purge()
+            entry = self._entries.get(scope_key)
+            if entry is None:
+                break
+            if entry.fingerprint != fingerprint:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Idempotency-Key was already used for a different request"
+                )
+            if entry.status_code is not None:
+                logger.info(f"Replaying stored response for idempotency key {scope_key[1]}")
+                return entry.replay()
+            # The first request is still running; wait for it, then re-check
+            await asyncio.shield(entry.done)
+
+        entry = _Entry(
+            fingerprint=fingerprint,
+            expires_at=time.monotonic() + self.ttl,
+            done=asyncio.get_running_loop().create_future()
+        )
+        self._entries[scope_key] = entry
+        try:
+            response = await call()
+        except HTTPException as e:
+            # Client errors are part of the outcome, so store them like responses
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+        except BaseException:
+            self._entries.pop(scope_key, None)
+            entry.done.set_result(None)
+            raise
+
+        if response.status_code >= 500 or not hasattr(response, "body"):
+            self._entries.pop(scope_key, None)
+        else:
+            entry.status_code = response.status_code
+            entry.body = response.body
+            entry.raw_headers = list(response.raw_headers)
+        entry.done.set_result(None)
+        return response
+
+    def clear(self):
+        self._entries.clear()
+
+    def _purge(self):
+        # Entries share one TTL, so insertion order is expiry order
+        now = time.monotonic()
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            if entry.status_code is None and entry.expires_at > now:
+                break  # Never evict a request that is still running
+            self._entries.pop(key)
+
+
+idempotency_store = IdempotencyStore(ttl=IDEMPOTENCY_KEY_TTL, max_entries=IDEMPOTENCY_MAX_ENTRIES)
+
+
+def request_principal(request: Request) -> Optional[str]:
+    """Subject of the request's bearer token if it verifies, else None."""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+
+class IdempotentRoute(APIRoute):
+    """
+    Route class honouring the Idempotency-Key header on POST requests.
+    Requests without the header, or without a valid token, run normally.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def idempotent_handler(request: Request) -> Response:
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if request.method != "POST" or not key:
+                return await handler(request)
+            if len(key) > MAX_KEY_LENGTH:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Idempotency-Key is too long")
+
+            principal = request_principal(request)
+            if principal is None:
+                return await handler(request)
+
+            # The body is cached on the request, so the handler can still read it
+            body = await request.body()
+            fingerprint = hashlib.sha256(b"\n".join([request.method.encode(), request.url.path.encode(), body])).hexdigest()
+            return await idempotency_store.execute((principal, key), fingerprint, lambda: handler(request))
+
+        return idempotent_handler
@@ -0,0 +1,126 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterator
+from sqlalchemy import select
+from reportlab.pdfgen import canvas
+from utils.database import SessionLocal
+from utils.invoice_snapshot import InvoiceSnapshot
+from utils.loader_profiles import INVOICE_RECEIPT
+from utils.pdf_cache import receipt_cache
+from utils.pdf_generator import RECEIPT_PAGE_SIZE, draw_receipt, receipt_cache_key, render_receipt_pdf
+from utils.timezones import IST
+from models.billing import Invoice
+from models.order_management import Order
+import logging
+import os
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+# Invoices fetched per server-side cursor round trip
+EXPORT_BATCH_SIZE = int(os.getenv("INVOICE_EXPORT_BATCH_SIZE", 200))
+
+
+class _StreamBuffer:
+    """Write-only, unseekable file object whose contents are drained between chunks."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def business_day_bounds(start_date: date, end_date: date):
+    """UTC (naive, as stored) bounds covering start_date..end_date in IST, end exclusive."""
+    def to_utc(day: date) -> datetime:
+        return datetime.combine(day, time.min, tzinfo=IST).astimezone(timezone.utc).replace(tzinfo=None)
+    return to_utc(start_date), to_utc(end_date + timedelta(days=1))
+
+
+def invoice_export_filter(outlet_id: int, start_date: date, end_date: date):
+    starts_at, ends_at = business_day_bounds(start_date, end_date)
+    return (
+        Order.outlet_id == outlet_id,
+        Invoice.created_at >= starts_at,
+        Invoice.created_at < ends_at
+    )
+
+
+def iter_invoices(outlet_id: int, start_date: date, end_date: date) -> Iterator[Invoice]:
+    """
+    Yield the outlet's invoices in the range, oldest first, through a
+    server-side cursor. Uses its own session because the response body is
+    streamed after the request's session has been closed. Nothing is modified,
+    so the session's weak identity map lets each batch be garbage collected
+    once it has been rendered and memory stays flat over long ranges.
+    """
+    stmt = select(Invoice).join(Order).options(*INVOICE_RECEIPT).where(
+        *invoice_export_filter(outlet_id, start_date, end_date)
+    ).order_by(Invoice.created_at, Invoice.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    db = SessionLocal()
+    try:
+        yield from db.scalars(stmt)
+    finally:
+        db.close()
+
+
+def _receipt_bytes(invoice: Invoice) -> bytes:
+    """Reuse a cached receipt when there is one; export renders are not cached."""
+    snapshot = InvoiceSnapshot.from_invoice(invoice)
+    cached = receipt_cache.get(receipt_cache_key(snapshot))
+    if isinstance(cached, str):
+        try:
+            with open(cached, "rb") as cached_file:
+                return cached_file.read()
+        except OSError:
+            cached = None
+    if cached is None:
+        return render_receipt_pdf(snapshot)
+    return cached
+
+
+def stream_receipts_zip(invoices: Iterator[Invoice]) -> Iterator[bytes]:
+    """Stream a ZIP archive with one receipt PDF per invoice, a chunk per receipt."""
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for invoice in invoices:
+            issued_at = (invoice.created_at or datetime.utcnow()).replace(tzinfo=timezone.utc).astimezone(IST)
+            entry = zipfile.ZipInfo(f"invoice_{invoice.invoice_number}.pdf", date_time=issued_at.timetuple()[:6])
+            entry.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(entry, _receipt_bytes(invoice))
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def stream_receipts_pdf(invoices: Iterator[Invoice]) -> Iterator[bytes]:
+    """
+    Stream one PDF with a receipt per page. Invoices are still read and drawn
+    incrementally, but reportlab keeps every finished page until save(), so
+    unlike the ZIP export this holds the whole document (a few KB per page)
+    in memory before the first byte is sent.
+    """
+    buffer = _StreamBuffer()
+    c = canvas.Canvas(buffer, pagesize=RECEIPT_PAGE_SIZE)
+    for invoice in invoices:
+        draw_receipt(c, InvoiceSnapshot.from_invoice(invoice))
+    c.save()
+    yield buffer.drain()
+
+
+def guarded_stream(chunks: Iterator[bytes], description: str) -> Iterator[bytes]:
+    """Log failures that happen after the response headers were already sent."""
+    try:
+        yield from chunks
+    except Exception as e:
+        logger.error(f"Export {description} aborted mid-stream: {str(e)}")
+        raise
@@ -0,0 +1,50 @@
+from datetime import date
+from typing import List, Optional
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from models.billing import InvoiceNumberCounter
+import os
+
+# Month (1-12) the fiscal year starts in; April for the Indian financial year
+FISCAL_YEAR_START_MONTH = int(os.getenv("FISCAL_YEAR_START_MONTH", 4))
+
+
+def fiscal_year_for(on: date) -> int:
+    """Return the calendar year the fiscal year containing `on` starts in."""
+    return on.year if on.month >= FISCAL_YEAR_START_MONTH else on.year - 1
+
+
+def fiscal_year_label(fiscal_year: int) -> str:
+    if FISCAL_YEAR_START_MONTH == 1:
+        return str(fiscal_year)
+    return f"{fiscal_year % 100:02d}{(fiscal_year + 1) % 100:02d}"
+
+
+def format_invoice_number(outlet_id: int, fiscal_year: int, number: int) -> str:
+    return f"O{outlet_id}-INV-{fiscal_year_label(fiscal_year)}-{number:04d}"
+
+
+def reserve_invoice_numbers(db: Session, outlet_id: int, count: int = 1, on: Optional[date] = None) -> List[str]:
+    """
+    Reserve `count` consecutive invoice numbers for an outlet in one statement.
+    The counter row stays locked until the caller's transaction ends, so numbers
+    are gapless and a rollback hands them back.
+    """
+    fiscal_year = fiscal_year_for(on or date.today())
+    stmt = insert(InvoiceNumberCounter).values(
+        outlet_id=outlet_id,
+        fiscal_year=fiscal_year,
+        last_value=count
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[InvoiceNumberCounter.outlet_id, InvoiceNumberCounter.fiscal_year],
+        set_={"last_value": InvoiceNumberCounter.last_value + stmt.excluded.last_value}
+    ).returning(InvoiceNumberCounter.last_value)
+
+    last_value = db.execute(stmt).scalar()
+    first_value = last_value - count + 1
+    return [format_invoice_number(outlet_id, fiscal_year, number) for number in range(first_value, last_value + 1)]
+
+
+def generate_invoice_number(db: Session, outlet_id: int) -> str:
+    return reserve_invoice_numbers(db, outlet_id, 1)[0]
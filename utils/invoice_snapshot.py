@@ -0,0 +1,149 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy.orm import Session
+from models.billing import Invoice, Payment
+from models.menu_management import MenuItem
+from models.order_management import Order, OrderItem
+from models.restaurant_chain import RestaurantChain
+from models.restaurant_outlet import RestaurantOutlet
+from utils.outlet_scope import OutletScope
+from utils.receipt_template import DEFAULT_RECEIPT_TEMPLATE, ReceiptTemplate
+
+
+def _enum_text(value) -> str:
+    if value is None:
+        return 'N/A'
+    if hasattr(value, 'value'):
+        return value.value
+    if hasattr(value, 'name'):
+        return value.name
+    return str(value)
+
+
+@dataclass(frozen=True)
+class ReceiptLine:
+    name: str
+    quantity: int
+    price: float
+
+
+@dataclass(frozen=True)
+class ReceiptPayment:
+    method: str
+    amount: Optional[float]
+    status: str
+
+
+@dataclass(frozen=True)
+class InvoiceSnapshot:
+    """
+    Plain, picklable copy of everything a receipt shows. Renderers take this
+    instead of the ORM Invoice so they can run in another process without a
+    database session.
+    """
+    invoice_id: int
+    invoice_number: str
+    created_at: Optional[datetime]
+    tax: float
+    discount: float
+    items: Tuple[ReceiptLine, ...]
+    payments: Tuple[ReceiptPayment, ...]
+    template: ReceiptTemplate = DEFAULT_RECEIPT_TEMPLATE
+    updated_at: Optional[datetime] = None
+    order_updated_at: Optional[datetime] = None
+
+    @property
+    def subtotal(self) -> float:
+        return sum(item.quantity * item.price for item in self.items)
+
+    @property
+    def tax_amount(self) -> float:
+        # Receipts print the invoice tax as a percentage of the item subtotal
+        return self.subtotal * (self.tax / 100) if self.tax else 0.0
+
+    @property
+    def net_total(self) -> float:
+        discount = self.discount if self.discount > 0 else 0.0
+        return self.subtotal + self.tax_amount - discount
+
+    @classmethod
+    def from_invoice(cls, invoice: Invoice) -> "InvoiceSnapshot":
+        order_items = invoice.order.items if invoice.order else []
+        return cls(
+            invoice_id=invoice.id,
+            invoice_number=invoice.invoice_number,
+            created_at=invoice.created_at,
+            tax=invoice.tax or 0.0,
+            discount=invoice.discount or 0.0,
+            items=tuple(
+                ReceiptLine(
+                    name=item.menu_item.name if item.menu_item else "Unknown Item",
+                    quantity=item.quantity or 0,
+                    price=item.price or 0
+                )
+                for item in order_items
+            ),
+            payments=tuple(
+                ReceiptPayment(
+                    method=_enum_text(payment.method),
+                    amount=payment.amount,
+                    status=_enum_text(payment.status)
+                )
+                for payment in invoice.payments
+            ),
+            template=ReceiptTemplate.from_outlet(invoice.order.outlet if invoice.order else None),
+            updated_at=invoice.updated_at,
+            order_updated_at=invoice.order.updated_at if invoice.order else None
+        )
+
+
+def load_invoice_snapshot(db: Session, invoice_id: int, scope: Optional[OutletScope] = None) -> Optional[InvoiceSnapshot]:
+    """
+    Load everything a receipt shows in two queries: the invoice with its
+    order, outlet, chain and payments, then the order lines with menu item
+    names. Returns None when the invoice does not exist or is outside scope.
+    """
+    query = db.query(Invoice, Order.updated_at, RestaurantOutlet, RestaurantChain, Payment).join(
+        Order, Invoice.order_id == Order.id
+    ).join(
+        RestaurantOutlet, Order.outlet_id == RestaurantOutlet.id
+    ).outerjoin(
+        RestaurantChain, RestaurantOutlet.chain_id == RestaurantChain.id
+    ).outerjoin(
+        Payment, Payment.invoice_id == Invoice.id
+    ).filter(Invoice.id == invoice_id)
+    if scope is not None:
+        query = query.filter(scope.predicate(Order.outlet_id))
+    rows = query.order_by(Payment.id).all()
+    if not rows:
+        return None
+    invoice, order_updated_at, outlet, _, _ = rows[0]
+
+    lines = db.query(OrderItem.quantity, OrderItem.price, MenuItem.name).outerjoin(
+        MenuItem, OrderItem.menu_item_id == MenuItem.id
+    ).filter(OrderItem.order_id == invoice.order_id).order_by(OrderItem.id).all()
+
+    return InvoiceSnapshot(
+        invoice_id=invoice.id,
+        invoice_number=invoice.invoice_number,
+        created_at=invoice.created_at,
+        tax=invoice.tax or 0.0,
+        discount=invoice.discount or 0.0,
+        items=tuple(
+            ReceiptLine(name=line.name or "Unknown Item", quantity=line.quantity or 0, price=line.price or 0)
+            for line in lines
+        ),
+        payments=tuple(
+            ReceiptPayment(
+                method=_enum_text(payment.method),
+                amount=payment.amount,
+                status=_enum_text(payment.status)
+            )
+            for _, _, _, _, payment in rows if payment is not None
+        ),
+        # The chain was loaded by the same query, so outlet.chain is an identity map hit
+        template=ReceiptTemplate.from_outlet(outlet),
+        updated_at=invoice.updated_at,
+        order_updated_at=order_updated_at
+    )
@@ -0,0 +1,37 @@
+from typing import List
+from sqlalchemy.orm import Session, joinedload, selectinload
+from models.order_management import Order, OrderItem
+from models.billing import Invoice
+from models.restaurant_outlet import RestaurantOutlet
+
+# Everything OrderResponse touches: items, with their menu item name and KOT
+ORDER_RESPONSE = (
+    selectinload(Order.items).options(
+        joinedload(OrderItem.menu_item),
+        joinedload(OrderItem.kot)
+    ),
+)
+
+# Everything InvoiceResponse touches
+INVOICE_RESPONSE = (
+    selectinload(Invoice.payments),
+)
+
+# Everything a receipt (InvoiceSnapshot) touches, for bulk exports
+INVOICE_RECEIPT = (
+    joinedload(Invoice.order).joinedload(Order.outlet).joinedload(RestaurantOutlet.chain),
+    joinedload(Invoice.order).selectinload(Order.items).joinedload(OrderItem.menu_item),
+    selectinload(Invoice.payments),
+)
+
+
+def load_order(db: Session, order_id: int) -> Order:
+    """Reload an order with the OrderResponse profile, e.g. after commit."""
+    return db.query(Order).options(*ORDER_RESPONSE).filter(Order.id == order_id).populate_existing().one()
+
+
+def load_invoices(db: Session, invoice_ids: List[int]) -> List[Invoice]:
+    """Reload invoices with the InvoiceResponse profile, keeping the given order."""
+    invoices = db.query(Invoice).options(*INVOICE_RESPONSE).filter(Invoice.id.in_(invoice_ids)).populate_existing().all()
+    invoices_by_id = {invoice.id: invoice for invoice in invoices}
+    return [invoices_by_id[invoice_id] for invoice_id in invoice_ids]
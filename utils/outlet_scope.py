@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import event, select, true
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from utils.database import SessionLocal
+from models.user import User, UserRole
+from models.restaurant_chain import RestaurantChain
+from models.restaurant_outlet import RestaurantOutlet
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how long another worker's chain/outlet changes can go unnoticed
+AUTH_SCOPE_CACHE_TTL = float(os.getenv("AUTH_SCOPE_CACHE_TTL", 60))
+
+STAFF_ROLES = [UserRole.MANAGER.value, UserRole.WAITER.value, UserRole.KITCHEN.value]
+
+# Models whose changes can alter a principal's outlet scope
+_SCOPE_MODELS = (User, RestaurantChain, RestaurantOutlet)
+
+
+@dataclass(frozen=True)
+class OutletScope:
+    """The set of outlets a principal may act on, as a SQL predicate or membership test."""
+    user_id: int
+    unrestricted: bool = False
+    outlet_id: Optional[int] = None  # Staff: the single assigned outlet
+    owner_id: Optional[int] = None  # Owners: every outlet of their chains
+    owner_outlet_ids: FrozenSet[int] = frozenset()
+
+    def predicate(self, outlet_column):
+        """Filter clause restricting outlet_column to this scope."""
+        if self.unrestricted:
+            return true()
+        if self.outlet_id is not None:
+            return outlet_column == self.outlet_id
+        return outlet_column.in_(
+            select(RestaurantOutlet.id).join(RestaurantChain).where(RestaurantChain.owner_id == self.owner_id)
+        )
+
+    def allows(self, outlet_id: int) -> bool:
+        if self.unrestricted:
+            return True
+        if self.outlet_id is not None:
+            return outlet_id == self.outlet_id
+        return outlet_id in self.owner_outlet_ids
+
+
+class OutletScopeCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.generation = 0
+        self._entries: Dict[Tuple, Tuple[int, float, OutletScope]] = {}
+
+    def get(self, key: Tuple) -> Optional[OutletScope]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        generation, expires_at, scope = entry
+        if generation != self.generation or expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return scope
+
+    def put(self, key: Tuple, scope: OutletScope):
+        self._entries[key] = (self.generation, time.monotonic() + self.ttl, scope)
+
+    def invalidate(self):
+        self.generation += 1
+        self._entries.clear()
+
+
+scope_cache = OutletScopeCache(AUTH_SCOPE_CACHE_TTL)
+
+
+class OutletIndex:
+    """
+    Ids of every outlet, for validating long-lived connections without
+    holding a session. Refreshed with a short-lived session when stale,
+    after local outlet changes commit, and on a miss (rate limited) so an
+    outlet created on another worker is found. Only one refresh runs at a
+    time; connections arriving meanwhile wait for it.
+    """
+
+    def __init__(self, ttl: float, miss_refresh_interval: float = 1.0):
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self._outlet_ids: FrozenSet[int] = frozenset()
+        self._loaded_at: Optional[float] = None
+        self._refreshing: Optional[asyncio.Future] = None
+
+    async def contains(self, outlet_id: int) -> bool:
+        age = time.monotonic() - self._loaded_at if self._loaded_at is not None else None
+        if age is None or age > self.ttl or (outlet_id not in self._outlet_ids and age > self.miss_refresh_interval):
+            await self._shared_refresh()
+        return outlet_id in self._outlet_ids
+
+    async def _shared_refresh(self):
+        # A reconnect storm after expiry would otherwise check out a pooled connection per socket
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(run_in_threadpool(self.refresh))
+            self._refreshing.add_done_callback(self._refresh_done)
+        await asyncio.shield(self._refreshing)
+
+    def _refresh_done(self, future: asyncio.Future):
+        self._refreshing = None
+        if not future.cancelled():
+            future.exception()  # Raised to the waiting callers; retrieved here in case none are left
+
+    def refresh(self):
+        db = SessionLocal()
+        try:
+            self._outlet_ids = frozenset(db.scalars(select(RestaurantOutlet.id)).all())
+            self._loaded_at = time.monotonic()
+        finally:
+            db.close()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+
+outlet_index = OutletIndex(AUTH_SCOPE_CACHE_TTL)
+
+
+def get_outlet_scope(current_user: User, db: Session) -> OutletScope:
+    """Resolve (and cache) the outlets current_user is authorized for."""
+    key = (current_user.id, current_user.role, current_user.outlet_id)
+    scope = scope_cache.get(key)
+    if scope is not None:
+        return scope
+
+    if current_user.role == UserRole.SUPERADMIN:
+        scope = OutletScope(user_id=current_user.id, unrestricted=True)
+    elif current_user.role == UserRole.OWNER:
+        outlet_ids = db.scalars(
+            select(RestaurantOutlet.id).join(RestaurantChain).where(RestaurantChain.owner_id == current_user.id)
+        ).all()
+        scope = OutletScope(user_id=current_user.id, owner_id=current_user.id, owner_outlet_ids=frozenset(outlet_ids))
+    elif current_user.role in STAFF_ROLES:
+        if not current_user.outlet_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not assigned to any outlet")
+        scope = OutletScope(user_id=current_user.id, outlet_id=current_user.outlet_id)
+    else:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid user role")
+
+    scope_cache.put(key, scope)
+    return scope
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _track_scope_changes(session: Session, flush_context):
+    if any(isinstance(obj, _SCOPE_MODELS) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["outlet_scope_changed"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_scope_cache(session: Session):
+    if session.info.pop("outlet_scope_changed", False):
+        scope_cache.invalidate()
+        outlet_index.invalidate()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_scope_changes(session: Session):
+    session.info.pop("outlet_scope_changed", None)
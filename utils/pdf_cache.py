@@ -0,0 +1,133 @@
+from collections import OrderedDict
+from typing import Optional, Union
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Receipt cache configuration
+RECEIPT_CACHE_MEMORY_BYTES = int(os.getenv("RECEIPT_CACHE_MEMORY_BYTES", 32 * 1024 * 1024))
+RECEIPT_CACHE_DISK_BYTES = int(os.getenv("RECEIPT_CACHE_DISK_BYTES", 512 * 1024 * 1024))
+RECEIPT_CACHE_DIR = os.getenv("RECEIPT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "rmspos-receipts"))
+
+
+class ReceiptCache:
+    """
+    Content-addressed store for rendered receipt PDFs. Keys are derived from
+    everything the rendering depends on, so an entry never needs invalidating:
+    a changed invoice simply hashes to a new key and the old one ages out.
+
+    Recent receipts live in an in-memory LRU bounded by memory_budget bytes.
+    Every render is also written through to directory, so entries evicted from
+    memory (or rendered by another worker) can still be served from disk.
+    """
+
+    def __init__(self, memory_budget: int, directory: Optional[str], disk_budget: int):
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.directory = self._prepare_directory(directory)
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes_written = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts) -> str:
+        return hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Union[bytes, str]]:
+        """Return the cached PDF bytes, the path of the spilled file, or None on a miss."""
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+                return content
+
+        path = self._path(key)
+        if path and os.path.exists(path):
+            return path
+        return None
+
+    def put(self, key: str, content: bytes):
+        with self._lock:
+            if key not in self._entries and len(content) <= self.memory_budget:
+                self._entries[key] = content
+                self._memory_bytes += len(content)
+                while self._memory_bytes > self.memory_budget:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._memory_bytes -= len(evicted)
+        self._spill(key, content)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+
+    def _path(self, key: str) -> Optional[str]:
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _prepare_directory(self, directory: Optional[str]) -> Optional[str]:
+        if not directory:
+            return None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            return directory
+        except OSError as e:
+            logger.warning(f"Receipt cache directory {directory} unavailable, disk tier disabled: {str(e)}")
+            return None
+
+    def _spill(self, key: str, content: bytes):
+        path = self._path(key)
+        if path is None or os.path.exists(path):
+            return
+        try:
+            # Write to a temp file and rename so readers never see a partial PDF
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to spill receipt {key} to disk: {str(e)}")
+            return
+
+        with self._lock:
+            self._disk_bytes_written += len(content)
+            should_prune = self._disk_bytes_written > self.disk_budget // 10
+            if should_prune:
+                self._disk_bytes_written = 0
+        if should_prune:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Delete the least recently used spilled receipts until the directory fits the disk budget."""
+        try:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(".pdf"):
+                    stat = entry.stat()
+                    files.append((stat.st_atime, stat.st_size, entry.path))
+        except OSError as e:
+            logger.warning(f"Failed to scan receipt cache directory: {str(e)}")
+            return
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_budget:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+receipt_cache = ReceiptCache(
+    memory_budget=RECEIPT_CACHE_MEMORY_BYTES,
+    directory=RECEIPT_CACHE_DIR,
+    disk_budget=RECEIPT_CACHE_DISK_BYTES
+)
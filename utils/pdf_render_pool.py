@@ -0,0 +1,150 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+from fastapi import HTTPException, status
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Render pool configuration
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", 2))
+PDF_RENDER_QUEUE_SIZE = int(os.getenv("PDF_RENDER_QUEUE_SIZE", 32))
+PDF_RENDER_TIMEOUT = float(os.getenv("PDF_RENDER_TIMEOUT", 10))
+
+# Number of recent render latencies kept for percentile metrics
+_LATENCY_WINDOW = 512
+
+
+class PdfRenderPool:
+    """
+    Runs CPU-bound PDF rendering in worker processes so it never blocks the
+    event loop. At most workers + queue_size jobs are accepted at once; beyond
+    that callers get 503 immediately instead of piling up behind the backlog.
+    Each job is bounded by timeout, after which the caller gets 504 and the
+    worker processes are replaced, since a running job cannot be cancelled;
+    until then the job keeps its slot.
+
+    With workers=0 jobs run in the default thread pool instead, which keeps
+    the event loop free but shares the GIL with request handling.
+    """
+
+    def __init__(self, workers: int, queue_size: int, timeout: float):
+        self.workers = max(workers, 0)
+        self.capacity = max(self.workers, 1) + max(queue_size, 0)
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._in_flight = 0
+        self._latencies = deque(maxlen=_LATENCY_WINDOW)
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "timed_out": 0, "recycled": 0}
+
+    async def render(self, func: Callable, *args):
+        """Run func(*args) in the pool and return its result."""
+        if self._in_flight >= self.capacity:
+            self._counters["rejected"] += 1
+            logger.warning(f"PDF render pool saturated ({self._in_flight}/{self.capacity}), rejecting job")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Receipt rendering is busy, please retry",
+                headers={"Retry-After": "1"}
+            )
+
+        self._counters["submitted"] += 1
+        started_at = time.perf_counter()
+        executor = None
+        try:
+            executor = self._get_executor()
+            future = asyncio.get_running_loop().run_in_executor(executor, func, *args)
+            # The slot stays taken until the job itself ends, not just until the
+            # caller stops waiting: a running job cannot be cancelled
+            self._in_flight += 1
+            future.add_done_callback(self._release)
+            result = await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._counters["timed_out"] += 1
+            logger.error(f"PDF render {getattr(func, '__name__', func)} timed out after {self.timeout}s")
+            if executor is not None:
+                # The worker is still busy with the job; replace the pool to reclaim it
+                self._reset_executor(executor, terminate=True)
+            raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Receipt rendering timed out")
+        except BrokenProcessPool as e:
+            self._counters["failed"] += 1
+            self._reset_executor(executor)
+            logger.error(f"PDF render pool broke, restarting it: {str(e)}")
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to render receipt")
+        except Exception as e:
+            self._counters["failed"] += 1
+            logger.error(f"PDF render {getattr(func, '__name__', func)} failed: {str(e)}")
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to render receipt: {str(e)}")
+
+        self._counters["completed"] += 1
+        self._latencies.append(time.perf_counter() - started_at)
+        return result
+
+    def metrics(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(int(p * len(latencies)), len(latencies) - 1)] * 1000, 2)
+
+        return {
+            **self._counters,
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self._in_flight,
+            "queued": max(self._in_flight - max(self.workers, 1), 0),
+            "saturation": round(self._in_flight / self.capacity, 3),
+            "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)}
+        }
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers == 0:
+            return None
+        with self._executor_lock:
+            if self._executor is None:
+                # Spawn rather than fork: the API process holds DB connections and threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _reset_executor(self, executor: Optional[ProcessPoolExecutor], terminate: bool = False):
+        # Only replace the pool the job ran on; another caller may have replaced it already
+        with self._executor_lock:
+            if executor is None or self._executor is not executor:
+                return
+            self._executor = None
+        processes = list((executor._processes or {}).values()) if terminate else []
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+        if terminate:
+            self._counters["recycled"] += 1
+            logger.warning(f"PDF render pool recycled, terminated {len(processes)} worker processes")
+
+    def _release(self, future: asyncio.Future):
+        self._in_flight -= 1
+        if not future.cancelled():
+            future.exception()  # Retrieved here when the caller stopped waiting
+
+
+render_pool = PdfRenderPool(
+    workers=PDF_RENDER_WORKERS,
+    queue_size=PDF_RENDER_QUEUE_SIZE,
+    timeout=PDF_RENDER_TIMEOUT
+)
@@ -0,0 +1,151 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+from models.restaurant_outlet import RestaurantOutlet
+import hashlib
+import threading
+
+# Compiled templates kept per process (API workers and render workers alike)
+TEMPLATE_CACHE_SIZE = 256
+
+
+@dataclass(frozen=True)
+class ReceiptTemplate:
+    """
+    The static, per-outlet text of a receipt. version changes whenever the
+    outlet or its chain is edited, so anything cached under it is rebuilt.
+    """
+    outlet_id: Optional[int]
+    version: str
+    title: str
+    header_lines: Tuple[str, ...]
+    footer_lines: Tuple[str, ...]
+
+    @classmethod
+    def from_outlet(cls, outlet: Optional[RestaurantOutlet]) -> "ReceiptTemplate":
+        if outlet is None:
+            return DEFAULT_RECEIPT_TEMPLATE
+        chain = outlet.chain
+        title = chain.name if chain else outlet.name
+
+        header_lines = []
+        if outlet.name != title:
+            header_lines.append(outlet.name)
+        header_lines.append(f"{outlet.address}, {outlet.city}, {outlet.state} {outlet.postal_code}")
+        if outlet.phone:
+            header_lines.append(f"Contact: {outlet.phone}")
+        if outlet.gst_number:
+            header_lines.append(f"GST No: {outlet.gst_number}")
+
+        footer_lines = ["Thank you for your visit!"]
+        if outlet.email:
+            footer_lines.append(f"Write to us: {outlet.email}")
+        footer_lines.append("Powered by RMS POS Pro")
+
+        version = "|".join(str(value) for value in (
+            outlet.updated_at or outlet.created_at,
+            (chain.updated_at or chain.created_at) if chain else None
+        ))
+        return cls(
+            outlet_id=outlet.id,
+            version=version,
+            title=title,
+            header_lines=tuple(header_lines),
+            footer_lines=tuple(footer_lines)
+        )
+
+
+DEFAULT_RECEIPT_TEMPLATE = ReceiptTemplate(
+    outlet_id=None,
+    version="default",
+    title="Your Restaurant",
+    header_lines=("123 Main St, City, ST 12345", "Contact: (555) 123-4567"),
+    footer_lines=("Thank you for your visit!", "Powered by RMS POS Pro")
+)
+
+
+@dataclass(frozen=True)
+class _TextOp:
+    font: str
+    size: int
+    y: float  # Offset below the top of the block
+    text: str
+
+
+@dataclass(frozen=True)
+class CompiledReceiptTemplate:
+    """Positioned header and footer text, drawn through per-document form XObjects."""
+    key: str
+    width: float
+    header_ops: Tuple[_TextOp, ...]
+    header_height: float
+    footer_ops: Tuple[_TextOp, ...]
+    footer_height: float
+
+    def draw_header(self, c: canvas.Canvas, top: float) -> float:
+        """Draw the header with its top at y=top and return the y below it."""
+        self._draw_form(c, "header", self.header_ops, self.header_height, top)
+        return top - self.header_height
+
+    def draw_footer(self, c: canvas.Canvas, top: float) -> float:
+        self._draw_form(c, "footer", self.footer_ops, self.footer_height, top)
+        return top - self.footer_height
+
+    def _draw_form(self, c: canvas.Canvas, part: str, ops: Tuple[_TextOp, ...], height: float, top: float):
+        # Forms live in one document, so each canvas defines it on first use and
+        # every later receipt page in that document only references it
+        name = f"receipt_{part}_{self.key}"
+        if not c.hasForm(name):
+            # The bounding box reaches above y=0 so the first line's glyphs are not clipped
+            c.beginForm(name, lowerx=0, lowery=-height, upperx=self.width, uppery=0.25 * inch)
+            for op in ops:
+                c.setFont(op.font, op.size)
+                c.drawCentredString(self.width / 2, -op.y, op.text)
+            c.endForm()
+        c.saveState()
+        c.translate(0, top)
+        c.doForm(name)
+        c.restoreState()
+
+
+_compiled: "OrderedDict[Tuple, CompiledReceiptTemplate]" = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def compile_template(template: ReceiptTemplate, width: float) -> CompiledReceiptTemplate:
+    """Lay out a template's static text once per (outlet, version, width)."""
+    cache_key = (template.outlet_id, template.version, width)
+    with _compiled_lock:
+        compiled = _compiled.get(cache_key)
+        if compiled is not None:
+            _compiled.move_to_end(cache_key)
+            return compiled
+
+    header_ops = [_TextOp("Helvetica-Bold", 14, 0, template.title)]
+    y = 0.2 * inch
+    for line in template.header_lines:
+        header_ops.append(_TextOp("Helvetica", 8, y, line))
+        y += 0.15 * inch
+    header_height = y + 0.1 * inch
+
+    footer_ops = []
+    y = 0.15 * inch
+    for line in template.footer_lines:
+        footer_ops.append(_TextOp("Helvetica", 8, y, line))
+        y += 0.15 * inch
+
+    compiled = CompiledReceiptTemplate(
+        key=hashlib.sha1(repr(cache_key).encode()).hexdigest()[:12],
+        width=width,
+        header_ops=tuple(header_ops),
+        header_height=header_height,
+        footer_ops=tuple(footer_ops),
+        footer_height=y
+    )
+    with _compiled_lock:
+        _compiled[cache_key] = compiled
+        while len(_compiled) > TEMPLATE_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return compiled
@@ -0,0 +1,142 @@
+from datetime import date, datetime, timezone
+from typing import Optional
+from sqlalchemy import and_, case, cast, delete, func, select, Date
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from models.billing import DailyOutletSales, Invoice, InvoiceStatus, Payment, PaymentMethod, PaymentStatus
+from models.order_management import Order
+from utils.timezones import IST, IST_OFFSET
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rollup column holding each payment method's takings
+PAYMENT_METHOD_COLUMNS = {
+    PaymentMethod.CASH.value: "cash_amount",
+    PaymentMethod.CARD.value: "card_amount",
+    PaymentMethod.UPI.value: "upi_amount"
+}
+
+AMOUNT_COLUMNS = [
+    "gross_amount", "discount_amount", "tax_amount", "net_amount",
+    "invoice_count", "payment_count", *PAYMENT_METHOD_COLUMNS.values()
+]
+
+
+def business_date(paid_at: datetime) -> date:
+    """IST calendar date of a naive UTC timestamp, as stored."""
+    return paid_at.replace(tzinfo=timezone.utc).astimezone(IST).date()
+
+
+def record_invoice_sale(db: Session, invoice: Invoice, outlet_id: int, paid_at: datetime):
+    """
+    Add a just-paid invoice to its outlet's day, in the caller's transaction.
+    The upsert increments in place, so concurrent payments never lose updates.
+    """
+    values = {column: 0 for column in AMOUNT_COLUMNS}
+    values.update(
+        gross_amount=invoice.subtotal or 0.0,
+        discount_amount=invoice.discount or 0.0,
+        tax_amount=invoice.tax or 0.0,
+        net_amount=invoice.total_amount or 0.0,
+        invoice_count=1
+    )
+    for payment in invoice.payments:
+        values["payment_count"] += 1
+        values[PAYMENT_METHOD_COLUMNS[PaymentMethod(payment.method).value]] += payment.amount or 0.0
+
+    stmt = insert(DailyOutletSales).values(
+        outlet_id=outlet_id,
+        business_date=business_date(paid_at),
+        updated_at=datetime.utcnow(),
+        **values
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[DailyOutletSales.outlet_id, DailyOutletSales.business_date],
+        set_={
+            **{column: getattr(DailyOutletSales, column) + getattr(stmt.excluded, column) for column in AMOUNT_COLUMNS},
+            "updated_at": stmt.excluded.updated_at
+        }
+    ))
+
+
+def rebuild_daily_sales(
+    db: Session,
+    outlet_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> int:
+    """
+    Recompute rollup rows from invoices and payments, e.g. to backfill history
+    or repair drift. Replaces the selected days in one transaction owned by
+    the caller and returns the number of rows written.
+    """
+    paid_at = func.coalesce(Invoice.paid_at, Invoice.updated_at)
+    paid_date = cast(paid_at + IST_OFFSET, Date)
+
+    payment_totals = select(
+        Payment.invoice_id,
+        func.count(Payment.id).label("payment_count"),
+        *[
+            func.sum(case((Payment.method == method, Payment.amount), else_=0.0)).label(column)
+            for method, column in PAYMENT_METHOD_COLUMNS.items()
+        ]
+    ).where(Payment.status == PaymentStatus.COMPLETED.value).group_by(Payment.invoice_id).subquery()
+
+    filters = [Invoice.status == InvoiceStatus.COMPLETED.value]
+    delete_filters = []
+    if outlet_id is not None:
+        filters.append(Order.outlet_id == outlet_id)
+        delete_filters.append(DailyOutletSales.outlet_id == outlet_id)
+    if start_date is not None:
+        filters.append(paid_date >= start_date)
+        delete_filters.append(DailyOutletSales.business_date >= start_date)
+    if end_date is not None:
+        filters.append(paid_date <= end_date)
+        delete_filters.append(DailyOutletSales.business_date <= end_date)
+
+    rollup = select(
+        Order.outlet_id,
+        paid_date.label("business_date"),
+        func.sum(func.coalesce(Invoice.subtotal, 0.0)),
+        func.sum(func.coalesce(Invoice.discount, 0.0)),
+        func.sum(func.coalesce(Invoice.tax, 0.0)),
+        func.sum(func.coalesce(Invoice.total_amount, 0.0)),
+        func.count(Invoice.id),
+        func.coalesce(func.sum(payment_totals.c.payment_count), 0),
+        *[func.coalesce(func.sum(payment_totals.c[column]), 0.0) for column in PAYMENT_METHOD_COLUMNS.values()],
+        func.now()
+    ).select_from(Invoice).join(Order, Invoice.order_id == Order.id).outerjoin(
+        payment_totals, payment_totals.c.invoice_id == Invoice.id
+    ).where(and_(*filters)).group_by(Order.outlet_id, paid_date)
+
+    db.execute(delete(DailyOutletSales).where(and_(*delete_filters)))
+    result = db.execute(insert(DailyOutletSales).from_select(
+        ["outlet_id", "business_date", *AMOUNT_COLUMNS, "updated_at"],
+        rollup
+    ))
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    # Backfill or repair: python -m utils.sales_rollup [--outlet ID] [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+    import argparse
+    from utils.database import SessionLocal
+    import models  # noqa: F401  Register every mapper before querying
+
+    parser = argparse.ArgumentParser(description="Rebuild the daily_outlet_sales rollup")
+    parser.add_argument("--outlet", type=int, default=None, help="Only this outlet")
+    parser.add_argument("--from", dest="start_date", type=date.fromisoformat, default=None, help="First business date")
+    parser.add_argument("--to", dest="end_date", type=date.fromisoformat, default=None, help="Last business date")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = rebuild_daily_sales(db, args.outlet, args.start_date, args.end_date)
+        db.commit()
+        print(f"Rebuilt {rows} daily sales rows")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
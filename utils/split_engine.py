@@ -0,0 +1,149 @@
+from dataclasses import dataclass, field
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, List, Optional, Sequence
+
+
+class SplitError(ValueError):
+    """Raised when a split request cannot be applied to the order."""
+
+
+@dataclass(frozen=True)
+class OrderLine:
+    id: int
+    price: float
+    quantity: int
+    seat_number: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class SplitShare:
+    """One split's amounts, in minor currency units (paise)."""
+    subtotal: int
+    discount: int
+    tax: int
+    detail: Dict = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return self.subtotal - self.discount + self.tax
+
+
+def to_minor(amount: Optional[float]) -> int:
+    return int((Decimal(str(amount or 0)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_major(amount: int) -> float:
+    return amount / 100
+
+
+def allocate(total: int, weights: Sequence[int]) -> List[int]:
+    """
+    Split an integer total across weights with the largest-remainder method,
+    so the parts always add up to the total exactly.
+    """
+    if not weights:
+        return []
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        weights = [1] * len(weights)
+        weight_sum = len(weights)
+
+    parts = []
+    remainders = []
+    for index, weight in enumerate(weights):
+        part, remainder = divmod(total * weight, weight_sum)
+        parts.append(part)
+        remainders.append((remainder, -index))
+
+    leftover = total - sum(parts)
+    for _, negative_index in sorted(remainders, reverse=True)[:leftover]:
+        parts[-negative_index] += 1
+    return parts
+
+
+def _shares_from_subtotals(subtotals: List[int], discount: int, tax: int, details: List[Dict]) -> List[SplitShare]:
+    discounts = allocate(discount, subtotals)
+    taxes = allocate(tax, subtotals)
+    return [
+        SplitShare(subtotal=subtotal, discount=split_discount, tax=split_tax, detail=detail)
+        for subtotal, split_discount, split_tax, detail in zip(subtotals, discounts, taxes, details)
+    ]
+
+
+def split_by_items(lines: List[OrderLine], item_groups: List[List[int]], discount: float, tax: float) -> List[SplitShare]:
+    line_totals = {line.id: to_minor(line.price) * line.quantity for line in lines}
+
+    assigned = set()
+    for item_ids in item_groups:
+        invalid_ids = set(item_ids) - line_totals.keys()
+        if invalid_ids:
+            raise SplitError(f"Invalid item IDs: {invalid_ids}")
+        repeated_ids = assigned & set(item_ids)
+        if repeated_ids:
+            raise SplitError(f"Item IDs appear in more than one split: {repeated_ids}")
+        assigned.update(item_ids)
+
+    missing_ids = line_totals.keys() - assigned
+    if missing_ids:
+        raise SplitError(f"All order items must be included in splits. Missing IDs: {missing_ids}")
+
+    subtotals = [sum(line_totals[item_id] for item_id in set(item_ids)) for item_ids in item_groups]
+    if any(subtotal == 0 for subtotal in subtotals):
+        raise SplitError("Split cannot have zero subtotal")
+
+    details = [{"item_ids": item_ids} for item_ids in item_groups]
+    return _shares_from_subtotals(subtotals, to_minor(discount), to_minor(tax), details)
+
+
+def split_by_amount(order_subtotal: float, amounts: List[float], discount: float, tax: float) -> List[SplitShare]:
+    minor_amounts = [to_minor(amount) for amount in amounts]
+    if any(amount <= 0 for amount in minor_amounts):
+        raise SplitError("Split amount must be positive")
+
+    expected_total = to_minor(order_subtotal) - to_minor(discount) + to_minor(tax)
+    if sum(minor_amounts) != expected_total:
+        raise SplitError("Split amounts must equal the order total minus discount plus tax")
+
+    # Discount and tax stay at order level; each split is a plain amount
+    return [
+        SplitShare(subtotal=amount, discount=0, tax=0, detail={"amount": to_major(amount)})
+        for amount in minor_amounts
+    ]
+
+
+def split_equally(order_subtotal: float, parts: int, discount: float, tax: float) -> List[SplitShare]:
+    if parts < 2:
+        raise SplitError("Equal splits need at least two parts")
+    subtotals = allocate(to_minor(order_subtotal), [1] * parts)
+    if any(subtotal == 0 for subtotal in subtotals):
+        raise SplitError("Split cannot have zero subtotal")
+    details = [{"part": index + 1, "parts": parts} for index in range(parts)]
+    return _shares_from_subtotals(subtotals, to_minor(discount), to_minor(tax), details)
+
+
+def split_by_seat(lines: List[OrderLine], discount: float, tax: float) -> List[SplitShare]:
+    """One split per seat; lines without a seat are shared equally by every seat."""
+    seat_totals: Dict[int, int] = {}
+    seat_items: Dict[int, List[int]] = {}
+    shared_total = 0
+    shared_ids = []
+    for line in lines:
+        line_total = to_minor(line.price) * line.quantity
+        if line.seat_number is None:
+            shared_total += line_total
+            shared_ids.append(line.id)
+        else:
+            seat_totals[line.seat_number] = seat_totals.get(line.seat_number, 0) + line_total
+            seat_items.setdefault(line.seat_number, []).append(line.id)
+
+    seats = sorted(seat_totals)
+    if len(seats) < 2:
+        raise SplitError("Seat splits need items assigned to at least two seats")
+
+    shared_parts = allocate(shared_total, [1] * len(seats))
+    subtotals = [seat_totals[seat] + shared_part for seat, shared_part in zip(seats, shared_parts)]
+    details = [
+        {"seat_number": seat, "item_ids": seat_items[seat], "shared_item_ids": shared_ids}
+        for seat in seats
+    ]
+    return _shares_from_subtotals(subtotals, to_minor(discount), to_minor(tax), details)
@@ -0,0 +1,5 @@
+from datetime import timedelta, timezone
+
+# Business dates, receipts and exports are in Indian Standard Time
+IST_OFFSET = timedelta(hours=5, minutes=30)
+IST = timezone(IST_OFFSET, "IST")
@@ -0,0 +1,139 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import case, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from utils.database import SessionLocal
+from models.order_management import Order, OrderTokenCounter
+from models.restaurant_outlet import RestaurantOutlet
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Token allocation configuration
+TOKEN_BLOCK_SIZE = int(os.getenv("TOKEN_BLOCK_SIZE", 1))
+TOKEN_DAILY_RESET = os.getenv("TOKEN_DAILY_RESET", "false").lower() in ("1", "true", "yes")
+TOKEN_BUSINESS_DAY_START_HOUR = int(os.getenv("TOKEN_BUSINESS_DAY_START_HOUR", 4))
+
+
+@dataclass
+class _TokenBlock:
+    business_date: Optional[date]
+    next_value: int
+    last_value: int
+
+
+class TokenAllocator:
+    """
+    Hands out per-outlet order token numbers from the order_token_counters row.
+    Numbers are reserved in their own short transaction, like a sequence, so
+    concurrent orders never wait on each other's request transaction. With a
+    block size above 1 each worker reserves a range and serves it from memory.
+    """
+
+    def __init__(self, block_size: int = 1, daily_reset: bool = False, day_start_hour: int = 4):
+        self.block_size = max(block_size, 1)
+        self.daily_reset = daily_reset
+        self.day_start_hour = day_start_hour
+        self._blocks: Dict[int, _TokenBlock] = {}  # outlet_id -> reserved block
+        self._locks: Dict[int, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def business_date(self, now: Optional[datetime] = None) -> Optional[date]:
+        """Business day the token belongs to, or None when tokens never reset."""
+        if not self.daily_reset:
+            return None
+        now = now or datetime.now()
+        return (now - timedelta(hours=self.day_start_hour)).date()
+
+    def format_token(self, outlet_id: int, number: int, business_date: Optional[date] = None) -> str:
+        if business_date is None:
+            return f"O{outlet_id}-TKN-{number:03d}"
+        return f"O{outlet_id}-{business_date:%y%m%d}-TKN-{number:03d}"
+
+    def next_token(self, outlet_id: int) -> str:
+        business_date = self.business_date()
+        number = self._next_number(outlet_id, business_date)
+        return self.format_token(outlet_id, number, business_date)
+
+    def reset(self):
+        """Drop every in-process block, e.g. after the counters were edited manually."""
+        with self._locks_guard:
+            self._blocks.clear()
+
+    def _outlet_lock(self, outlet_id: int) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(outlet_id, threading.Lock())
+
+    def _next_number(self, outlet_id: int, business_date: Optional[date]) -> int:
+        with self._outlet_lock(outlet_id):
+            block = self._blocks.get(outlet_id)
+            if block is None or block.business_date != business_date or block.next_value > block.last_value:
+                last_value = self._reserve(outlet_id, business_date, self.block_size)
+                block = _TokenBlock(business_date, last_value - self.block_size + 1, last_value)
+                self._blocks[outlet_id] = block
+            number = block.next_value
+            block.next_value += 1
+            return number
+
+    def _reserve(self, outlet_id: int, business_date: Optional[date], count: int) -> int:
+        """Atomically advance the outlet counter by count and return the new last value."""
+        stmt = update(OrderTokenCounter).where(
+            OrderTokenCounter.outlet_id == outlet_id
+        ).values(
+            last_value=case(
+                (OrderTokenCounter.business_date.is_not_distinct_from(business_date), OrderTokenCounter.last_value + count),
+                else_=count
+            ),
+            business_date=business_date,
+            updated_at=datetime.utcnow()
+        ).returning(OrderTokenCounter.last_value)
+
+        db = SessionLocal()
+        try:
+            last_value = db.execute(stmt).scalar()
+            if last_value is None:
+                self._seed_counter(db, outlet_id)
+                last_value = db.execute(stmt).scalar()
+            db.commit()
+            return last_value
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _seed_counter(self, db: Session, outlet_id: int):
+        """Create the outlet counter, continuing from the last legacy token if any."""
+        if not db.query(RestaurantOutlet.id).filter(RestaurantOutlet.id == outlet_id).first():
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Outlet not found")
+
+        last_value = 0
+        latest_order = db.query(Order.token_number).filter(
+            Order.outlet_id == outlet_id,
+            Order.token_number.like(f"O{outlet_id}-TKN-%")
+        ).order_by(Order.id.desc()).first()
+        if latest_order:
+            try:
+                last_value = int(latest_order.token_number.split('-')[-1])
+            except (IndexError, ValueError):
+                logger.error(f"Invalid token number format: {latest_order.token_number} for outlet {outlet_id}")
+
+        db.execute(
+            insert(OrderTokenCounter).values(
+                outlet_id=outlet_id,
+                business_date=None,
+                last_value=last_value
+            ).on_conflict_do_nothing(index_elements=[OrderTokenCounter.outlet_id])
+        )
+
+
+token_allocator = TokenAllocator(
+    block_size=TOKEN_BLOCK_SIZE,
+    daily_reset=TOKEN_DAILY_RESET,
+    day_start_hour=TOKEN_BUSINESS_DAY_START_HOUR
+)
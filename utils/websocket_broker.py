@@ -0,0 +1,490 @@
+from collections import deque
+from typing import Callable, Deque, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
+from utils.event_log import event_log
+import asyncio
+import json
+import logging
+import os
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # Optional: pip install msgpack to offer binary msgpack frames
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# Messages buffered per socket before the slow-consumer policy applies
+WEBSOCKET_QUEUE_SIZE = int(os.getenv("WEBSOCKET_QUEUE_SIZE", 256))
+# "drop_oldest" discards the oldest queued message; "disconnect" closes the socket
+WEBSOCKET_SLOW_CONSUMER_POLICY = os.getenv("WEBSOCKET_SLOW_CONSUMER_POLICY", "drop_oldest")
+# Seconds a single send may take before the socket is considered stalled
+WEBSOCKET_SEND_TIMEOUT = float(os.getenv("WEBSOCKET_SEND_TIMEOUT", 5))
+# zlib level for the json.deflate encoding
+WEBSOCKET_DEFLATE_LEVEL = int(os.getenv("WEBSOCKET_DEFLATE_LEVEL", 6))
+# Seconds between heartbeat pings to sockets that opted in with ?heartbeat=true; 0 disables them
+WEBSOCKET_PING_INTERVAL = float(os.getenv("WEBSOCKET_PING_INTERVAL", 20))
+# Seconds past a ping interval before a heartbeat client that sent nothing is presumed dead
+WEBSOCKET_PONG_TIMEOUT = float(os.getenv("WEBSOCKET_PONG_TIMEOUT", 20))
+# Connection caps per worker; 0 means unlimited
+WEBSOCKET_MAX_CONNECTIONS = int(os.getenv("WEBSOCKET_MAX_CONNECTIONS", 10000))
+WEBSOCKET_MAX_CONNECTIONS_PER_OUTLET = int(os.getenv("WEBSOCKET_MAX_CONNECTIONS_PER_OUTLET", 200))
+
+TOPIC_ORDER_STATUS = "order_status"
+TOPIC_KOT = "kot"
+TOPIC_BILLING = "billing"
+ALL_TOPICS = frozenset({TOPIC_ORDER_STATUS, TOPIC_KOT, TOPIC_BILLING})
+
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_DISCONNECT = "disconnect"
+
+SLOW_CONSUMER_CLOSE_CODE = 1008
+TRY_AGAIN_LATER_CLOSE_CODE = 1013
+
+# Why sockets were evicted, as counted in metrics()
+EVICTION_REASONS = ("send_failed", "send_timeout", "slow_consumer", "missed_pong")
+
+# Send latencies kept for the percentiles in metrics()
+LATENCY_SAMPLES = 1000
+
+# Queued in place of a message to make the writer close the socket
+_CLOSE = object()
+
+
+Frame = Union[str, bytes]  # str is sent as a text frame, bytes as a binary frame
+
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+ENCODING_JSON_DEFLATE = "json.deflate"
+
+
+def _encode_json(message: dict) -> str:
+    # Same wire format as WebSocket.send_json
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def _encode_json_deflate(message: dict) -> bytes:
+    # zlib-wrapped, so browsers can read it with DecompressionStream("deflate")
+    return zlib.compress(_encode_json(message).encode(), WEBSOCKET_DEFLATE_LEVEL)
+
+
+def _encode_msgpack(message: dict) -> bytes:
+    return msgpack.packb(message, use_bin_type=True)
+
+
+# Encodings a client can pick with ?encoding=
+ENCODERS: Dict[str, Callable[[dict], Frame]] = {
+    ENCODING_JSON: _encode_json,
+    ENCODING_JSON_DEFLATE: _encode_json_deflate
+}
+if msgpack is not None:
+    ENCODERS[ENCODING_MSGPACK] = _encode_msgpack
+
+
+# Heartbeat frames, only for clients that connect with ?heartbeat=true: the server sends
+# {"type": "ping"} (in the socket's encoding) and the client answers "pong" or {"type": "pong"}
+PING_MESSAGE = {"type": "ping"}
+
+
+class Subscriber:
+    """One connected socket, its topics and its outgoing queue."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        outlet_id: int,
+        topics: FrozenSet[str],
+        queue_size: int,
+        encoding: str,
+        heartbeat: bool = False
+    ):
+        self.websocket = websocket
+        self.outlet_id = outlet_id
+        self.topics = topics
+        self.encoding = encoding
+        self.heartbeat = heartbeat  # Opted in to ping frames, and to eviction when it stops answering
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.closing = False
+        self.replayed_through: Optional[int] = None  # Queued events up to this seq were already replayed
+        self.send_deadline: Optional[float] = None  # Loop time the send in progress must finish by
+        self.last_received: Optional[float] = None
+        self.last_ping: Optional[float] = None
+        self.writer: Optional[asyncio.Task] = None
+
+
+class WebSocketBroker:
+    """
+    Fans events out to every socket subscribed to an outlet and topic.
+    publish() encodes the message once per encoding in use and puts the
+    same frame on each socket's bounded queue; a writer task per socket
+    does the sending, so a stalled client delays nobody but itself. When a
+    queue is full the configured policy either drops that socket's oldest
+    message or disconnects it.
+
+    A sweeper task evicts sockets whose send has stalled. Clients that
+    connect with heartbeat enabled are also sent {"type": "ping"} when idle
+    and evicted when nothing, pong or otherwise, arrives in time; other
+    clients never see a ping. Sockets whose send fails are evicted straight
+    away.
+    """
+
+    def __init__(
+        self,
+        queue_size: int,
+        policy: str,
+        send_timeout: float,
+        ping_interval: float = 0,
+        pong_timeout: float = 0,
+        max_connections: int = 0,
+        max_connections_per_outlet: int = 0
+    ):
+        if policy not in (POLICY_DROP_OLDEST, POLICY_DISCONNECT):
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.ping_interval = ping_interval
+        self.pong_timeout = pong_timeout
+        self.max_connections = max_connections
+        self.max_connections_per_outlet = max_connections_per_outlet
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self._connections = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sweeper: Optional[asyncio.Task] = None
+        self._dropped = 0
+        self._rejected = 0
+        self._evictions: Dict[str, int] = dict.fromkeys(EVICTION_REASONS, 0)
+        self._send_latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        outlet_id: int,
+        topics: Iterable[str] = ALL_TOPICS,
+        since: Optional[int] = None,
+        encoding: str = ENCODING_JSON,
+        heartbeat: bool = False
+    ) -> Optional[Subscriber]:
+        """
+        Accept and subscribe the socket. With since, it first receives the
+        logged events after that seq, or a resync_required message when
+        they are no longer all available. Returns None, having closed the
+        socket with 1013, when a connection cap is reached.
+        """
+        await websocket.accept()
+        self._loop = asyncio.get_running_loop()
+        # Checked after accept, with no await before registering, so concurrent connects cannot overshoot
+        outlet_connections = len(self._subscribers.get(outlet_id, ()))
+        if (self.max_connections and self._connections >= self.max_connections) or (
+            self.max_connections_per_outlet and outlet_connections >= self.max_connections_per_outlet
+        ):
+            self._rejected += 1
+            logger.warning(f"Rejecting WebSocket for outlet {outlet_id}: connection limit reached")
+            await self._close(websocket, TRY_AGAIN_LATER_CLOSE_CODE, "Too many connections")
+            return None
+
+        subscriber = Subscriber(websocket, outlet_id, frozenset(topics), self.queue_size, encoding, heartbeat)
+        subscriber.last_received = self._loop.time()
+        # Subscribe before reading the log, so nothing published meanwhile is missed
+        self._subscribers.setdefault(outlet_id, set()).add(subscriber)
+        self._connections += 1
+        try:
+            replay = await self._replay(subscriber, since) if since is not None else []
+        except Exception:
+            self._unregister(subscriber)
+            raise
+        subscriber.writer = asyncio.create_task(self._write(subscriber, replay))
+        if self._sweeper is None or self._sweeper.done() or self._sweeper.get_loop() is not self._loop:
+            self._sweeper = asyncio.create_task(self._sweep())
+        logger.debug(f"WebSocket connected for outlet {outlet_id}. Total connections: {len(self._subscribers[outlet_id])}")
+        return subscriber
+
+    def disconnect(self, subscriber: Subscriber):
+        self._unregister(subscriber)
+        if subscriber.writer is not None and subscriber.writer is not asyncio.current_task():
+            subscriber.writer.cancel()
+
+    async def serve(
+        self,
+        websocket: WebSocket,
+        outlet_id: int,
+        topics: Iterable[str] = ALL_TOPICS,
+        since: Optional[int] = None,
+        encoding: str = ENCODING_JSON,
+        heartbeat: bool = False
+    ):
+        """Accept the socket and hold it open until the client leaves or is evicted."""
+        if encoding not in ENCODERS:
+            await websocket.close(code=4000, reason=f"Unsupported encoding; use one of {', '.join(ENCODERS)}")
+            return
+        subscriber = await self.connect(websocket, outlet_id, topics, since, encoding, heartbeat)
+        if subscriber is None:
+            return
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                # Any frame, a pong or otherwise, shows the client is alive
+                subscriber.last_received = self._loop.time()
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            # The writer may already have closed a slow or broken socket
+            if websocket.application_state != WebSocketState.DISCONNECTED:
+                logger.error(f"WebSocket error for outlet {outlet_id}: {str(e)}")
+                await self._close(websocket, 4000, str(e))
+        finally:
+            self.disconnect(subscriber)
+
+    def publish(self, topic: str, outlet_id: int, message: dict) -> int:
+        """
+        Queue message for every subscriber of outlet_id and topic without
+        waiting for delivery. Returns the number of sockets it was queued for.
+        """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self._loop is not None and not self._loop.is_closed() and running is not self._loop:
+            # Called from another thread or loop; queues belong to the serving loop
+            self._loop.call_soon_threadsafe(self._fan_out, topic, outlet_id, message)
+            return len(self._subscribers.get(outlet_id, ()))
+        return self._fan_out(topic, outlet_id, message)
+
+    def metrics(self) -> dict:
+        latencies = sorted(self._send_latencies)
+
+        def percentile(fraction: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000, 3)
+
+        return {
+            "connections": self._connections,
+            "connections_by_outlet": {outlet_id: len(subscribers) for outlet_id, subscribers in self._subscribers.items()},
+            "max_connections": self.max_connections,
+            "max_connections_per_outlet": self.max_connections_per_outlet,
+            "rejected_connections": self._rejected,
+            "evictions": dict(self._evictions),
+            "policy": self.policy,
+            "queue_size": self.queue_size,
+            "dropped_messages": self._dropped,
+            "send_latency_ms": {
+                "samples": len(latencies),
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(latencies[-1] * 1000, 3) if latencies else None
+            }
+        }
+
+    async def _replay(self, subscriber: Subscriber, since: int) -> List[Tuple[Optional[int], Frame]]:
+        encode = ENCODERS[subscriber.encoding]
+        events = await event_log.events_since(subscriber.outlet_id, since)
+        if events is None:
+            return [(None, encode(event_log.resync_message(subscriber.outlet_id)))]
+        subscriber.replayed_through = events[-1].seq if events else since
+        return [(event.seq, encode(event.message)) for event in events if event.topic in subscriber.topics]
+
+    def _fan_out(self, topic: str, outlet_id: int, message: dict) -> int:
+        seq = message.get("seq")
+        frames: Dict[str, Frame] = {}  # Encoded once per encoding, shared by every socket using it
+        queued = 0
+        for subscriber in list(self._subscribers.get(outlet_id, ())):
+            if topic in subscriber.topics and not subscriber.closing:
+                frame = frames.get(subscriber.encoding)
+                if frame is None:
+                    frame = frames[subscriber.encoding] = ENCODERS[subscriber.encoding](message)
+                self._offer(subscriber, (seq, frame))
+                queued += 1
+        return queued
+
+    def _offer(self, subscriber: Subscriber, item: Tuple[Optional[int], Frame]):
+        try:
+            subscriber.queue.put_nowait(item)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if self.policy == POLICY_DROP_OLDEST:
+            subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(item)
+            subscriber.dropped += 1
+            self._dropped += 1
+            if subscriber.dropped == 1 or subscriber.dropped % self.queue_size == 0:
+                logger.warning(f"Slow WebSocket consumer for outlet {subscriber.outlet_id}: dropped {subscriber.dropped} messages")
+            return
+
+        # Disconnect: discard the backlog and let the writer close the socket
+        logger.warning(f"Disconnecting slow WebSocket consumer for outlet {subscriber.outlet_id}")
+        subscriber.closing = True
+        self._evictions["slow_consumer"] += 1
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(_CLOSE)
+
+    async def _write(self, subscriber: Subscriber, replay: List[Tuple[Optional[int], Frame]]):
+        websocket = subscriber.websocket
+        try:
+            for _, frame in replay:
+                await self._send(subscriber, frame)
+            while True:
+                item = await subscriber.queue.get()
+                if item is _CLOSE:
+                    await self._close(websocket, SLOW_CONSUMER_CLOSE_CODE, "Slow consumer")
+                    return
+                seq, frame = item
+                if seq is not None and subscriber.replayed_through is not None and seq <= subscriber.replayed_through:
+                    continue
+                await self._send(subscriber, frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to send WebSocket message to outlet {subscriber.outlet_id}; disconnecting: {str(e)}")
+            self._evictions["send_failed"] += 1
+            self._unregister(subscriber)
+            await self._close(websocket, SLOW_CONSUMER_CLOSE_CODE, "Send failed")
+        finally:
+            self._unregister(subscriber)
+
+    async def _send(self, subscriber: Subscriber, frame: Frame):
+        # A deadline checked by _sweep instead of wait_for, which costs a task and a timer per send
+        started = self._loop.time()
+        subscriber.send_deadline = started + self.send_timeout
+        if isinstance(frame, str):
+            await subscriber.websocket.send_text(frame)
+        else:
+            await subscriber.websocket.send_bytes(frame)
+        subscriber.send_deadline = None
+        self._send_latencies.append(self._loop.time() - started)
+
+    async def _sweep(self):
+        """Heartbeat and eviction pass over every socket; runs while any are connected."""
+        interval = min((value for value in (self.send_timeout, self.ping_interval, self.pong_timeout) if value > 0), default=1.0) / 2
+        while self._subscribers:
+            await asyncio.sleep(interval)
+            now = self._loop.time()
+            evict: List[Tuple[Subscriber, str]] = []
+            for subscribers in self._subscribers.values():
+                for subscriber in subscribers:
+                    if subscriber.send_deadline is not None and subscriber.send_deadline < now:
+                        evict.append((subscriber, "send_timeout"))
+                    elif not (self.ping_interval and subscriber.heartbeat):
+                        continue
+                    elif now - subscriber.last_received > self.ping_interval + self.pong_timeout:
+                        evict.append((subscriber, "missed_pong"))
+                    elif now - (subscriber.last_ping or subscriber.last_received) >= self.ping_interval:
+                        self._ping(subscriber, now)
+
+            for subscriber, reason in evict:
+                logger.warning(f"Evicting WebSocket for outlet {subscriber.outlet_id}: {reason}")
+                self._evictions[reason] += 1
+                self.disconnect(subscriber)
+                await self._close(subscriber.websocket, SLOW_CONSUMER_CLOSE_CODE, reason.replace("_", " ").capitalize())
+
+    def _ping(self, subscriber: Subscriber, now: float):
+        # Pings skip full queues: the policy already handles a socket that far behind
+        if subscriber.closing or subscriber.queue.full():
+            return
+        subscriber.last_ping = now
+        subscriber.queue.put_nowait((None, ENCODERS[subscriber.encoding](PING_MESSAGE)))
+
+    async def _close(self, websocket: WebSocket, code: int, reason: str):
+        if websocket.application_state == WebSocketState.DISCONNECTED:
+            return
+        try:
+            await asyncio.wait_for(websocket.close(code=code, reason=reason), self.send_timeout)
+        except Exception as e:
+            logger.debug(f"WebSocket close failed: {str(e)}")
+
+    def _unregister(self, subscriber: Subscriber):
+        subscribers = self._subscribers.get(subscriber.outlet_id)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        self._connections -= 1
+        if not subscribers:
+            del self._subscribers[subscriber.outlet_id]
+        logger.debug(f"WebSocket disconnected for outlet {subscriber.outlet_id}. Total connections: {len(subscribers)}")
+
+
+broker = WebSocketBroker(
+    queue_size=WEBSOCKET_QUEUE_SIZE,
+    policy=WEBSOCKET_SLOW_CONSUMER_POLICY,
+    send_timeout=WEBSOCKET_SEND_TIMEOUT,
+    ping_interval=WEBSOCKET_PING_INTERVAL,
+    pong_timeout=WEBSOCKET_PONG_TIMEOUT,
+    max_connections=WEBSOCKET_MAX_CONNECTIONS,
+    max_connections_per_outlet=WEBSOCKET_MAX_CONNECTIONS_PER_OUTLET
+)
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m utils.websocket_broker
+    import time
+
+    class _NullSocket:
+        application_state = WebSocketState.CONNECTED
+
+        async def accept(self):
+            pass
+
+        async def send_text(self, data: str):
+            pass
+
+        async def send_bytes(self, data: bytes):
+            pass
+
+    clients, events = 1000, 200
+    message = {
+        "type": "new_kots",
+        "outlet_id": 1,
+        "order_id": 4821,
+        "token_number": "O1-TKN-142",
+        "table_id": 7,
+        "timestamp": "2026-10-17T12:30:00",
+        "kots": [
+            {"outlet_id": 1, "id": 9000 + n, "order_id": 4821, "item_name": f"Paneer Butter Masala {n}", "quantity": 2, "notes": "Less spicy"}
+            for n in range(5)
+        ]
+    }
+
+    async def per_socket_json():
+        # What each broadcast used to do: send_json, so one json.dumps per socket
+        sockets = [_NullSocket() for _ in range(clients)]
+        start = time.process_time()
+        for seq in range(events):
+            for socket in sockets:
+                await socket.send_text(_encode_json({**message, "seq": seq}))
+        return time.process_time() - start
+
+    async def through_broker(encodings):
+        broker = WebSocketBroker(queue_size=events + 1, policy=POLICY_DROP_OLDEST, send_timeout=5)
+        subscribers = [
+            await broker.connect(_NullSocket(), 1, ALL_TOPICS, encoding=encodings[n % len(encodings)])
+            for n in range(clients)
+        ]
+        start = time.process_time()
+        for seq in range(events):
+            broker.publish(TOPIC_KOT, 1, {**message, "seq": seq})
+            await asyncio.sleep(0)
+        while any(not subscriber.queue.empty() for subscriber in subscribers):
+            await asyncio.sleep(0)
+        elapsed = time.process_time() - start
+        for subscriber in subscribers:
+            broker.disconnect(subscriber)
+        return elapsed
+
+    print(f"{clients} clients, {events} KOT events")
+    for name, encode in ENCODERS.items():
+        print(f"  {name:<13} {len(encode(message)):5d} bytes per frame")
+    print("CPU per event:")
+    seconds = asyncio.run(per_socket_json())
+    print(f"  {'send_json per socket':<42} {seconds / events * 1000:7.2f} ms")
+    for encodings in [[name] for name in ENCODERS] + [list(ENCODERS)]:
+        seconds = asyncio.run(through_broker(encodings))
+        print(f"  {'broker, ' + ' + '.join(encodings):<42} {seconds / events * 1000:7.2f} ms")